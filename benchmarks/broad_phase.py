@@ -0,0 +1,92 @@
+"""Broad phase collision search benchmark.
+
+Compares the uniform-grid spatial hash (`objects.collisions.spatial_hash_pairs`)
+with the previous per-ball `Rect.collidelistall` search.
+The world size grows with the number of balls, so that the density
+(fraction of the area covered by balls) stays constant.
+
+Usage:
+    python -m benchmarks.broad_phase --n-balls 50 200 1000 5000 20000
+"""
+import argparse
+import time
+
+import pygame
+import numpy as np
+
+from objects.collisions import spatial_hash_pairs
+
+
+def make_world(n_balls, radius, density, seed=0):
+    """Return random top-left corners of `n_balls` balls and the world size."""
+    side = int(np.sqrt(n_balls * np.pi * radius ** 2 / density))
+    rng = np.random.RandomState(seed)
+    pos = rng.randint(0, side - 2 * radius, size=(n_balls, 2))
+    return pos, side
+
+
+def true_pairs(pos, radius, i, j):
+    """Number of candidate pairs which are real circle collisions."""
+    dist2 = ((pos[i] - pos[j]) ** 2).sum(axis=1)
+    return int((dist2 <= (2 * radius) ** 2).sum())
+
+
+def bench_spatial_hash(pos, radius, repeat):
+    centers = pos + radius
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        i, j = spatial_hash_pairs(centers, 2 * radius)
+    dt = (time.perf_counter() - t0) / repeat
+    return dt, len(i), true_pairs(pos, radius, i, j)
+
+
+def bench_collidelistall(pos, radius, repeat):
+    group = pygame.sprite.Group()
+    for x, y in pos.tolist():
+        s = pygame.sprite.Sprite()
+        s.rect = pygame.Rect(x, y, 2 * radius, 2 * radius)
+        group.add(s)
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        pairs = []
+        for index, s in enumerate(group):
+            # Same as the previous Ball.update()
+            all_balls = group.sprites()
+            overlapping = s.rect.collidelistall(all_balls)
+            pairs.extend((index, k) for k in overlapping if k != index)
+    dt = (time.perf_counter() - t0) / repeat
+
+    if len(pairs) == 0:
+        return dt, 0, 0
+    i, j = np.array(pairs).T
+    # Every pair is reported twice, count real collisions once
+    return dt, len(pairs), true_pairs(pos, radius, i, j) // 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n-balls', type=int, nargs='+',
+                        default=[50, 200, 1000, 5000, 20000])
+    parser.add_argument('--radius', type=int, default=10)
+    parser.add_argument('--density', type=float, default=0.2,
+                        help='fraction of the world area covered by balls')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--legacy-max', type=int, default=5000,
+                        help='skip collidelistall above this number of balls')
+    args = parser.parse_args()
+
+    header = f"{'method':>16} {'n_balls':>8} {'ms/pass':>10} {'candidates':>11} " \
+             f"{'collisions':>11} {'pairs/s':>12}"
+    print(header)
+    print('-' * len(header))
+
+    for n in args.n_balls:
+        pos, side = make_world(n, args.radius, args.density)
+        methods = [('spatial_hash', bench_spatial_hash)]
+        if n <= args.legacy_max:
+            methods.append(('collidelistall', bench_collidelistall))
+        for name, bench in methods:
+            dt, candidates, collisions = bench(pos, args.radius, args.repeat)
+            print(f"{name:>16} {n:>8} {dt * 1e3:>10.3f} {candidates:>11} "
+                  f"{collisions:>11} {candidates / dt:>12.0f}")
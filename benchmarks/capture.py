@@ -0,0 +1,104 @@
+"""Camera capture stage benchmark.
+
+Compares the original capture loop of `CameraProcess` (new arrays
+for every frame, transposed copy into shared memory) with
+`camera.camera_process_shm.CaptureStage` (preallocated buffers,
+conversion straight into the ring buffer slot).
+
+No camera is needed. The frames come either from an MJPEG video
+written to a temporary file (decoding included, like a USB camera
+delivering MJPEG) or from memory (only the capture stage itself).
+CPU time per frame is the process time of the loop, fps is the
+achieved frame rate when reading as fast as possible.
+
+Usage:
+    python -m benchmarks.capture --frames 300
+    python -m benchmarks.capture --camera-size 640 480
+"""
+import os
+import argparse
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from process import SharedFrameRing
+from camera.camera_process_shm import CaptureStage
+from config import CONFIG
+
+
+class MemoryCapture:
+    """`cv2.VideoCapture` stand-in returning the same BGR image."""
+    def __init__(self, image):
+        self.image = image
+
+    def read(self, image=None):
+        if image is None:
+            return True, self.image.copy()
+        image[:] = self.image
+        return True, image
+
+
+def legacy_read(cap, shared_frame, size):
+    """Capture loop body before the capture stage was reworked."""
+    ret, frame = cap.read()
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    if (frame.shape[0] != size[1]) or (frame.shape[1] != size[0]):
+        frame = cv2.resize(frame, size)
+    frame = np.swapaxes(frame, 0, 1)
+    shared_frame.put_array(frame)
+    return ret
+
+
+def write_video(path, size, n_frames):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, size)
+    for f in range(n_frames):
+        image = np.zeros((size[1], size[0], 3), np.uint8)
+        cv2.circle(image, (f * 7 % size[0], size[1] // 2), size[1] // 5,
+                   (80, 160, 240), -1)
+        writer.write(image)
+    writer.release()
+
+
+def measure(read, n_frames):
+    read()
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    for _ in range(n_frames):
+        read()
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - t0
+    return cpu / n_frames * 1e3, n_frames / wall
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--camera-size', type=int, nargs=2, default=None,
+                        help='size of the camera images (default: screen size)')
+    args = parser.parse_args()
+
+    size = (CONFIG['screen_width'], CONFIG['screen_height'])
+    camera_size = tuple(args.camera_size) if args.camera_size else size
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'capture.avi')
+        write_video(path, camera_size, args.frames + 1)
+        image = cv2.VideoCapture(path).read()[1]
+
+        print(f"camera {camera_size[0]}x{camera_size[1]} -> frames {size[0]}x{size[1]}")
+        print(f"{'source':>7} {'stage':>7} {'CPU ms/frame':>13} {'fps':>8}")
+        for source in ('video', 'memory'):
+            for name in ('legacy', 'new'):
+                ring = SharedFrameRing(*size, row_major=(name == 'new'))
+                cap = cv2.VideoCapture(path) if source == 'video' else MemoryCapture(image)
+                if name == 'legacy':
+                    def read():
+                        return legacy_read(cap, ring, size)
+                else:
+                    stage = CaptureStage(*size)
+
+                    def read():
+                        return stage.read(cap, ring)
+                cpu_ms, fps = measure(read, args.frames)
+                print(f"{source:>7} {name:>7} {cpu_ms:>13.2f} {fps:>8.0f}")
+                del ring
@@ -0,0 +1,111 @@
+"""Face detection latency vs. recall benchmark.
+
+Runs a detection backend (default dlib HOG) with the preprocessing
+options of `face.preprocess.detect_faces()` (grayscale, downscaling,
+upsampling for dlib) on local test images and videos. The reference
+boxes are the detections of the most sensitive setting (full resolution,
+RGB, upsampled once for dlib, like the original detector process). The recall
+of a setting is the fraction of the reference boxes it finds
+(IoU >= `--iou`); `extra` counts its boxes without a reference box.
+
+Usage:
+    python -m benchmarks.detection faces/*.jpg clip.mp4
+    python -m benchmarks.detection clip.mp4 --scales 1 0.5 --upsample 0 1 --video-step 10
+    python -m benchmarks.detection clip.mp4 --backend opencv_haar
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from face import create_backend
+from face.preprocess import detect_faces
+from config import CONFIG
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.webm')
+
+
+def load_frames(paths, video_step, max_frames):
+    """Return RGB images (height, width, channel) from image and video files."""
+    frames = []
+    for path in paths:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            cap = cv2.VideoCapture(path)
+            k = 0
+            while len(frames) < max_frames:
+                ret, image = cap.read()
+                if not ret:
+                    break
+                if k % video_step == 0:
+                    frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+                k += 1
+            cap.release()
+        else:
+            image = cv2.imread(path)
+            if image is None:
+                raise FileNotFoundError(path)
+            frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    return frames[:max_frames]
+
+
+def iou(a, b):
+    """IoU of the boxes `a` (n, 4) and `b` (m, 4), array (n, m)."""
+    left = np.maximum(a[:, None, 0], b[None, :, 0])
+    top = np.maximum(a[:, None, 1], b[None, :, 1])
+    right = np.minimum(a[:, None, 2], b[None, :, 2])
+    bottom = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter)
+
+
+def run(backend, frames, scale, grayscale):
+    """Return the boxes found in each frame and the detection times (ms)."""
+    boxes, times = [], []
+    for image in frames:
+        t0 = time.perf_counter()
+        boxes.append(detect_faces(backend, image, scale, grayscale))
+        times.append((time.perf_counter() - t0) * 1e3)
+    return boxes, np.array(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('inputs', nargs='+', help='image and video files')
+    parser.add_argument('--backend', default='dlib_hog')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1., 0.75, 0.5, 0.25])
+    parser.add_argument('--upsample', type=int, nargs='+', default=[0, 1])
+    parser.add_argument('--video-step', type=int, default=5, help='use every n-th video frame')
+    parser.add_argument('--max-frames', type=int, default=200)
+    parser.add_argument('--iou', type=float, default=0.3)
+    args = parser.parse_args()
+
+    frames = load_frames(args.inputs, args.video_step, args.max_frames)
+    options = CONFIG['face_backend_options']
+    if args.backend != 'dlib_hog':
+        args.upsample = [0]
+    reference, _ = run(create_backend(args.backend, **options, upsample=1), frames, 1., False)
+    n_reference = sum(len(r) for r in reference)
+    print(f"{len(frames)} frames, {n_reference} reference faces")
+
+    print(f"{'gray':>5} {'scale':>6} {'upsample':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'recall':>7} {'extra':>6}")
+    for grayscale in (False, True):
+        for scale in args.scales:
+            for upsample in args.upsample:
+                backend = create_backend(args.backend, **options, upsample=upsample)
+                boxes, times = run(backend, frames, scale, grayscale)
+                found = extra = 0
+                for ref, det in zip(reference, boxes):
+                    if len(ref) == 0 or len(det) == 0:
+                        extra += len(det)
+                        continue
+                    overlap = iou(ref, det) >= args.iou
+                    found += overlap.any(axis=1).sum()
+                    extra += (~overlap.any(axis=0)).sum()
+                recall = found / n_reference if n_reference > 0 else float('nan')
+                print(f"{str(grayscale):>5} {scale:>6.2f} {upsample:>9} "
+                      f"{np.percentile(times, 50):>8.1f} {np.percentile(times, 95):>8.1f} "
+                      f"{recall:>7.2f} {extra:>6}")
@@ -0,0 +1,93 @@
+"""Face detector pool benchmark.
+
+Publishes frames to a `SharedFrameRing` at the camera frame rate
+(from a video file, or a synthetic scene) and runs the multi-process
+`FaceDetector` with different numbers of worker processes and no rate
+limit. Reported are the detection results per second used by the
+render side, their mean age, and the fraction of the results of the
+worker processes that arrived after a result of a newer frame (read from
+the per-process `SharedDetections` records; the render side drops them).
+
+Usage:
+    python -m benchmarks.detector_pool --workers 1 2 4 8
+    python -m benchmarks.detector_pool --video clip.mp4 --seconds 10
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from process import SharedFrameRing
+from face import FaceDetector
+from face.preprocess import prepare_image
+from benchmarks.tracking import synthetic_scene
+from benchmarks.detection import load_frames
+from config import CONFIG
+
+
+def publish(ring, frames, fps, stop):
+    """Publish the frames in a loop at `fps` until `stop` is set."""
+    k = 0
+    while not stop.is_set():
+        ring.put_image(frames[k % len(frames)])
+        k += 1
+        time.sleep(1. / fps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--video', default=None, help='video file (default: synthetic scene)')
+    parser.add_argument('--fps', type=float, default=30., help='camera frame rate')
+    parser.add_argument('--seconds', type=float, default=5.)
+    parser.add_argument('--backend', default='dlib_hog')
+    args = parser.parse_args()
+
+    width, height = CONFIG['screen_width'], CONFIG['screen_height']
+    if args.video:
+        frames = [prepare_image(f, grayscale=False)
+                  for f in load_frames([args.video], 1, 300)]
+        width, height = frames[0].shape[1], frames[0].shape[0]
+    else:
+        frames, _ = synthetic_scene(60, (width, height))
+
+    print(f"{'workers':>8} {'det/s':>7} {'age ms':>7} {'late %':>7}")
+    for n_workers in args.workers:
+        ring = SharedFrameRing(width, height)
+        stop = threading.Event()
+        camera = threading.Thread(target=publish, args=(ring, frames, args.fps, stop))
+        camera.start()
+        detector = FaceDetector(ring, backend=args.backend,
+                                backend_options=CONFIG['face_backend_options'],
+                                n_workers=n_workers)
+
+        # Wait for the first result (workers started)
+        while detector.n_results == 0:
+            detector.detect(ring.get_array())
+            time.sleep(0.005)
+
+        n0, t0 = detector.n_results, time.perf_counter()
+        ages, arrivals = [], []
+        versions = [d.version for d in detector.detections]
+        while time.perf_counter() - t0 < args.seconds:
+            # Raw results of the workers, in the order of arrival
+            for k, d in enumerate(detector.detections):
+                if d.version != versions[k]:
+                    result = d.read()
+                    versions[k] = result[-1]
+                    arrivals.append(result[1])
+            n = detector.n_results
+            detector.detect(ring.get_array())
+            if detector.n_results > n:
+                ages.append(detector.latency_ms)
+            time.sleep(0.002)
+        rate = (detector.n_results - n0) / (time.perf_counter() - t0)
+        seqs = np.array(arrivals)
+        late = seqs[1:] < np.maximum.accumulate(seqs)[:-1]
+        late_percent = 100. * late.mean() if len(late) > 0 else 0.
+        print(f"{n_workers:>8} {rate:>7.1f} {np.mean(ages):>7.1f} {late_percent:>7.1f}")
+
+        stop.set()
+        camera.join()
+        del detector
@@ -0,0 +1,78 @@
+"""Camera frame to screen benchmark.
+
+Times the path of one camera frame from the camera process
+(an RGB image in the OpenCV (height, width, channel) layout) to the
+display surface, for three variants:
+
+- make_surface: transposed copy into the ring buffer, new surface
+  from `pygame.surfarray.make_surface()`, blit to the screen
+- blit_array: same, but one persistent surface updated in place
+- zero_copy: row-major ring buffer shown through `render.FrameSurface`
+  (surfaces over the shared memory), blit to the screen
+
+Copies are full-frame copies; MB/s is the memory moved by them
+at the configured frame rate.
+
+Usage:
+    python -m benchmarks.frame_path --frames 200
+"""
+import argparse
+import time
+
+import pygame
+import numpy as np
+
+import headless
+from process import SharedFrameRing
+from render import FrameSurface
+from config import CONFIG
+
+RESOLUTIONS = [(800, 600), (1280, 720), (1920, 1080)]
+
+
+def make_surface_path(ring, screen, image):
+    ring.put_image(image)
+    surf = pygame.surfarray.make_surface(ring.get_array())
+    screen.blit(surf, (0, 0))
+
+
+def frame_surface_path(frame_surface):
+    def path(ring, screen, image):
+        ring.put_image(image)
+        screen.blit(frame_surface.update(ring.get_array()), (0, 0))
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--fps', type=int, default=CONFIG['fps'])
+    args = parser.parse_args()
+
+    print(f"{'resolution':>10} {'path':>13} {'copies':>7} {'allocs':>7} "
+          f"{'MB/s':>7} {'ms/frame':>9}")
+    for width, height in RESOLUTIONS:
+        screen = headless.init_display(dict(CONFIG, screen_width=width, screen_height=height))
+        image = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+        frame_mb = image.nbytes / 1e6
+
+        column_ring = SharedFrameRing(width, height, row_major=False)
+        row_ring = SharedFrameRing(width, height, row_major=True)
+        variants = [
+            ('make_surface', column_ring, make_surface_path, 3, 1),
+            ('blit_array', column_ring,
+             frame_surface_path(FrameSurface((width, height))), 3, 0),
+            ('zero_copy', row_ring,
+             frame_surface_path(FrameSurface((width, height), row_ring)), 2, 0)
+        ]
+        for name, ring, path, copies, allocs in variants:
+            path(ring, screen, image)
+            t0 = time.perf_counter()
+            for _ in range(args.frames):
+                path(ring, screen, image)
+            ms = (time.perf_counter() - t0) / args.frames * 1e3
+            print(f"{f'{width}x{height}':>10} {name:>13} {copies:>7} {allocs:>7} "
+                  f"{copies * frame_mb * args.fps:>7.0f} {ms:>9.2f}")
+        del column_ring, row_ring
+
+    pygame.quit()
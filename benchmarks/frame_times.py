@@ -0,0 +1,49 @@
+"""Frame time comparison of two profiler outputs.
+
+Reads the per-frame stage times written by `utils.FrameProfiler`
+(.csv or .jsonl, e.g. from replays of the same recorded session with
+two builds) and prints p50/p95/p99 of every stage in both runs.
+
+Usage:
+    python main.py --replay recordings/demo --headless --fast --profile-output new.csv
+    python -m benchmarks.frame_times new.csv --compare old.csv
+"""
+import argparse
+import csv
+import json
+
+import numpy as np
+
+
+def load(path: str) -> dict:
+    """Return {stage: array of the times in ms} of a profiler output."""
+    with open(path) as f:
+        if path.endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f]
+    names = [k for k in rows[0] if k != 'frame_index'] if rows else []
+    return {name: np.array([float(r[name]) for r in rows if r.get(name) not in (None, '')])
+            for name in names}
+
+
+def percentiles(times: np.ndarray) -> tuple:
+    """Return (p50, p95, p99) of the times."""
+    return tuple(np.percentile(times, [50, 95, 99])) if len(times) > 0 else (np.nan,) * 3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('output', help='profiler output (.csv or .jsonl)')
+    parser.add_argument('--compare', default=None, help='profiler output of another build')
+    args = parser.parse_args()
+
+    new = load(args.output)
+    old = load(args.compare) if args.compare else {}
+    print(f"{'stage':<22} {'p50':>8} {'p95':>8} {'p99':>8}" +
+          (f" {'old p50':>8} {'old p95':>8} {'old p99':>8}" if old else ''))
+    for name, times in new.items():
+        line = f"{name:<22}" + ''.join(f" {v:>8.3f}" for v in percentiles(times))
+        if name in old:
+            line += ''.join(f" {v:>8.3f}" for v in percentiles(old[name]))
+        print(line)
@@ -0,0 +1,70 @@
+"""Parallel physics benchmark.
+
+Steps the same seeded world with the single-process `BallSystem`
+and with `ParallelBallSystem` for several worker counts, checks that
+the final states are identical and reports the speedup.
+The screen is enlarged, so that many balls fit on it.
+
+Usage:
+    python -m benchmarks.parallel --n-balls 50000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import time
+
+import pygame
+import numpy as np
+
+import headless
+from objects import World
+from utils import PressedKeys
+from config import CONFIG
+
+
+def bench(config, n_balls, radius, frames, workers, seed=0):
+    """Return frame time (ms) and final positions and velocities."""
+    config = dict(config, physics_workers=workers)
+    world = World.from_config(config, n_balls, radius, seed=seed)
+    keys = PressedKeys([pygame.K_DOWN])
+
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        world.step(keys)
+    dt = (time.perf_counter() - t0) / frames
+
+    state = (world.balls.pos.copy(), world.balls.velocity.copy())
+    world.close()
+    return dt * 1e3, state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n-balls', type=int, default=50000)
+    parser.add_argument('--radius', type=int, default=5)
+    parser.add_argument('--screen', type=int, nargs=2, default=[4000, 3000])
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--output', default=None, help='JSON lines file')
+    args = parser.parse_args()
+
+    config = dict(CONFIG, screen_width=args.screen[0], screen_height=args.screen[1])
+    headless.init_display(dict(config, screen_width=1, screen_height=1))
+
+    base_ms, base_state = bench(config, args.n_balls, args.radius, args.frames, 0)
+    print(f"{'workers':>8} {'ms/frame':>10} {'speedup':>8} {'identical':>10}")
+    print(f"{0:>8} {base_ms:>10.2f} {1:>8.2f} {'-':>10}")
+
+    results = [dict(workers=0, ms=base_ms, speedup=1., identical=True)]
+    for n in args.workers:
+        ms, state = bench(config, args.n_balls, args.radius, args.frames, n)
+        identical = all(np.array_equal(a, b) for a, b in zip(base_state, state))
+        print(f"{n:>8} {ms:>10.2f} {base_ms / ms:>8.2f} {str(identical):>10}")
+        results.append(dict(workers=n, ms=ms, speedup=base_ms / ms, identical=identical))
+
+    if args.output is not None:
+        with open(args.output, 'a') as f:
+            for r in results:
+                r.update(n_balls=args.n_balls, radius=args.radius, frames=args.frames)
+                f.write(json.dumps(r) + '\n')
+
+    pygame.quit()
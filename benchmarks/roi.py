@@ -0,0 +1,63 @@
+"""ROI-first face detection benchmark.
+
+Runs a detection backend (default dlib HOG) on consecutive video
+frames, once scanning the full frame every time and once with
+`face.roi.RoiDetector`.
+The average detection latency and the number of faces found are
+reported separately for frames with one face and with several
+faces (counted by the full-frame scan).
+
+Usage:
+    python -m benchmarks.roi one_face.mp4 group.mp4 --full-every 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from face import create_backend
+from face.preprocess import prepare_image
+from face.roi import RoiDetector
+from benchmarks.detection import load_frames
+from config import CONFIG
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('inputs', nargs='+', help='video files')
+    parser.add_argument('--backend', default='dlib_hog')
+    parser.add_argument('--full-every', type=int, default=10)
+    parser.add_argument('--pad', type=float, default=0.5)
+    parser.add_argument('--scale', type=float, default=1.)
+    parser.add_argument('--upsample', type=int, default=0)
+    parser.add_argument('--max-frames', type=int, default=300)
+    args = parser.parse_args()
+
+    backend = create_backend(args.backend, **CONFIG['face_backend_options'],
+                             upsample=args.upsample)
+    run = backend.detect
+
+    print(f"{'faces':>6} {'mode':>5} {'frames':>7} {'mean ms':>8} {'p95 ms':>7} {'found':>6}")
+    for path in args.inputs:
+        frames = [prepare_image(f, args.scale, not backend.color)
+                  for f in load_frames([path], 1, args.max_frames)]
+        roi = RoiDetector(run, args.pad, args.full_every)
+        n_faces, times, found = [], {'full': [], 'roi': []}, {'full': [], 'roi': []}
+        for image in frames:
+            for mode in ('full', 'roi'):
+                t0 = time.perf_counter()
+                boxes = run(image) if mode == 'full' else roi.detect(image)
+                times[mode].append((time.perf_counter() - t0) * 1e3)
+                found[mode].append(len(boxes))
+            n_faces.append(found['full'][-1])
+
+        n_faces = np.array(n_faces)
+        print(path)
+        for label, select in (('1', n_faces == 1), ('2+', n_faces >= 2)):
+            if not select.any():
+                continue
+            for mode in ('full', 'roi'):
+                t = np.array(times[mode])[select]
+                print(f"{label:>6} {mode:>5} {select.sum():>7} {t.mean():>8.1f} "
+                      f"{np.percentile(t, 95):>7.1f} {np.array(found[mode])[select].sum():>6}")
+        print(f"full-frame scans in ROI mode: {roi.full_scans}/{roi.runs}")
@@ -0,0 +1,58 @@
+"""Sleeping bodies benchmark.
+
+Balls are pushed down (key press) for a number of frames, then the key
+is released and the scene settles. Frame time is reported together with
+the number of awake balls, so that it can be checked that the frame
+time falls with the number of awake balls.
+
+Usage:
+    python -m benchmarks.sleeping --n-balls 3000 --radius 4
+"""
+import argparse
+import time
+
+import pygame
+import numpy as np
+
+import headless
+from objects import World
+from utils import PressedKeys
+from config import CONFIG
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n-balls', type=int, default=3000)
+    parser.add_argument('--radius', type=int, default=4)
+    parser.add_argument('--push-frames', type=int, default=200)
+    parser.add_argument('--frames', type=int, default=1200)
+    parser.add_argument('--window', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-sleep', action='store_true',
+                        help='disable sleeping (for comparison)')
+    args = parser.parse_args()
+
+    headless.init_display()
+    world = World.from_config(CONFIG, args.n_balls, args.radius, seed=args.seed)
+    if args.no_sleep:
+        world.balls.sleep_frames = np.inf
+
+    push = PressedKeys([pygame.K_DOWN])
+    idle = PressedKeys()
+    frame_times = np.zeros(args.frames)
+    awake = np.zeros(args.frames, dtype=int)
+
+    for f in range(args.frames):
+        t0 = time.perf_counter()
+        world.step(push if f < args.push_frames else idle)
+        frame_times[f] = time.perf_counter() - t0
+        awake[f] = world.balls.n_awake
+
+    print(f"{'frames':>12} {'awake':>8} {'p50 ms':>8}")
+    for f0 in range(0, args.frames, args.window):
+        f1 = min(f0 + args.window, args.frames)
+        print(f"{f'{f0}-{f1}':>12} {awake[f0:f1].mean():>8.0f} "
+              f"{np.percentile(frame_times[f0:f1], 50) * 1e3:>8.2f}")
+
+    world.close()
+    pygame.quit()
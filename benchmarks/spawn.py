@@ -0,0 +1,68 @@
+"""Spawn storm benchmark.
+
+Balls are spawned in bursts at the top of the screen, pushed down
+(key press) and despawned when they leave through an opening
+in the bottom edge. Frame times are reported in windows, together
+with the number of balls and the capacity of the ball buffers.
+
+Usage:
+    python -m benchmarks.spawn --burst 20 --frames 1000
+    python -m benchmarks.spawn --no-prefill --capacity 1
+"""
+import argparse
+import time
+
+import pygame
+import numpy as np
+
+import headless
+from objects import World
+from utils import PressedKeys
+from config import CONFIG
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--burst', type=int, default=20, help='balls per burst')
+    parser.add_argument('--every', type=int, default=2, help='frames between bursts')
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--window', type=int, default=100)
+    parser.add_argument('--radius', type=int, default=5)
+    parser.add_argument('--capacity', type=int, default=2048)
+    parser.add_argument('--no-prefill', action='store_true',
+                        help='do not create the sprites in advance')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    width, height = CONFIG['screen_width'], CONFIG['screen_height']
+    config = dict(CONFIG, ball_capacity=args.capacity if not args.no_prefill else 0,
+                  openings=[('bottom', 0, width)])
+    headless.init_display(config)
+    world = World.from_config(config, 0, args.radius, seed=args.seed)
+    world.balls.reserve(args.capacity)
+
+    keys = PressedKeys([pygame.K_DOWN])
+    color = CONFIG['colors']['blue']
+    frame_times = np.zeros(args.frames)
+    n_balls = np.zeros(args.frames, dtype=int)
+    capacity = np.zeros(args.frames, dtype=int)
+
+    for f in range(args.frames):
+        t0 = time.perf_counter()
+        if f % args.every == 0:
+            x = np.random.randint(args.radius, width - args.radius)
+            world.spawn_burst((x, height // 4), args.burst, 3., args.radius, color)
+        world.step(keys)
+        frame_times[f] = time.perf_counter() - t0
+        n_balls[f] = len(world.balls)
+        capacity[f] = world.balls.capacity
+
+    print(f"{'frames':>12} {'balls':>7} {'capacity':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for f0 in range(0, args.frames, args.window):
+        f1 = min(f0 + args.window, args.frames)
+        window = frame_times[f0:f1] * 1e3
+        print(f"{f'{f0}-{f1}':>12} {n_balls[f0:f1].mean():>7.0f} {capacity[f1 - 1]:>9} "
+              f"{np.percentile(window, 50):>8.2f} {np.percentile(window, 99):>8.2f}")
+
+    world.close()
+    pygame.quit()
@@ -0,0 +1,98 @@
+"""Headless physics benchmark suite.
+
+Sweeps the number of balls, ball radius and number of walls, runs each
+configuration with `headless.simulate()` and writes one JSON record
+per configuration (JSON lines). Each record contains the git commit,
+so the results of different commits can be compared with `--compare`.
+
+Usage:
+    python -m benchmarks.suite --output bench.jsonl
+    python -m benchmarks.suite --output new.jsonl --compare old.jsonl
+"""
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import time
+
+import pygame
+
+import headless
+
+
+def git_commit() -> str:
+    """Return the current git commit hash (or 'unknown')."""
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def config_key(record: dict) -> tuple:
+    """Key identifying a benchmark configuration."""
+    return (record['n_balls'], record['radius'], record['n_walls'])
+
+
+def sweep(n_balls, radii, n_walls, frames, seed=0, keys=('down',), draw=False):
+    """Run all combinations of the parameters.
+
+    Yields:
+        dict with the results of a single configuration
+    """
+    commit = git_commit()
+    for n, r, w in itertools.product(n_balls, radii, n_walls):
+        result = headless.simulate(frames, n, r, w, seed, keys, draw)
+        result.update(commit=commit,
+                      timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                      python=platform.python_version(),
+                      machine=platform.machine())
+        yield result
+
+
+def compare(old: list, new: list) -> None:
+    """Print the p50 frame time and steps/s of `new` relative to `old`."""
+    old = {config_key(r): r for r in old}
+    print(f"{'n_balls':>8} {'radius':>6} {'n_walls':>7} "
+          f"{'old p50':>9} {'new p50':>9} {'speedup':>8}")
+    for r in new:
+        o = old.get(config_key(r))
+        if o is None:
+            continue
+        print(f"{r['n_balls']:>8} {r['radius']:>6} {r['n_walls']:>7} "
+              f"{o['p50_ms']:>9.3f} {r['p50_ms']:>9.3f} "
+              f"{r['steps_per_s'] / o['steps_per_s']:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n-balls', type=int, nargs='+', default=[50, 500, 2000, 10000])
+    parser.add_argument('--radius', type=int, nargs='+', default=[5, 10])
+    parser.add_argument('--n-walls', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--draw', action='store_true')
+    parser.add_argument('--output', default='bench.jsonl',
+                        help='JSON lines file, results are appended')
+    parser.add_argument('--compare', default=None,
+                        help='JSON lines file with results of another commit')
+    args = parser.parse_args()
+
+    results = []
+    with open(args.output, 'a') as f:
+        for result in sweep(args.n_balls, args.radius, args.n_walls,
+                            args.frames, args.seed, draw=args.draw):
+            print(f"n_balls={result['n_balls']} radius={result['radius']} "
+                  f"n_walls={result['n_walls']}: {result['steps_per_s']:.1f} steps/s, "
+                  f"p50={result['p50_ms']:.3f} ms, p99={result['p99_ms']:.3f} ms, "
+                  f"peak={result['peak_mb']:.2f} MB")
+            f.write(json.dumps(result) + '\n')
+            results.append(result)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare([json.loads(line) for line in f if line.strip()], results)
+
+    pygame.quit()
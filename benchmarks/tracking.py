@@ -0,0 +1,106 @@
+"""Face tracking benchmark.
+
+Compares two ways of getting face boxes between full detections
+that run every `--every` frames: holding the boxes of the last
+detection (the old behaviour) and following them with
+`face.tracker.FaceTracker`. The reference boxes are the per-frame
+detections. Reported are the tracker cost per frame and the box
+error against the reference (center distance in pixels, IoU).
+
+Without inputs a synthetic scene is used: a textured patch moving
+over a textured background with sensor noise, with known boxes.
+With video files the reference is dlib detection on every frame.
+
+Usage:
+    python -m benchmarks.tracking --every 10 30
+    python -m benchmarks.tracking clip.mp4 --every 10 30
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from face.tracker import FaceTracker
+from benchmarks.detection import iou
+
+
+def synthetic_scene(n_frames, size=(800, 600), face=160, seed=0):
+    """Return noisy RGB frames and the boxes of a textured patch moving on a Lissajous path."""
+    rng = np.random.RandomState(seed)
+    width, height = size
+    background = cv2.GaussianBlur(rng.randint(0, 256, (height, width, 3), dtype=np.uint8),
+                                  (0, 0), 3)
+    patch = cv2.GaussianBlur(rng.randint(0, 256, (face, face, 3), dtype=np.uint8), (0, 0), 2)
+    frames, boxes = [], []
+    for f in range(n_frames):
+        t = f / 30.
+        x = int((width - face) * (0.5 + 0.4 * np.sin(1.3 * t)))
+        y = int((height - face) * (0.5 + 0.4 * np.sin(0.9 * t + 1.)))
+        image = background.copy()
+        image[y:y + face, x:x + face] = patch
+        noise = rng.normal(0, 6, image.shape)
+        frames.append(np.clip(image + noise, 0, 255).astype(np.uint8))
+        boxes.append(np.array([[x, y, x + face, y + face]]))
+    return frames, boxes
+
+
+def detected_scene(paths, max_frames):
+    """Return RGB frames of the videos and their per-frame dlib detections."""
+    from face import create_backend
+    from face.preprocess import detect_faces
+    from benchmarks.detection import load_frames
+
+    backend = create_backend('dlib_hog')
+    frames = load_frames(paths, 1, max_frames)
+    return frames, [detect_faces(backend, image) for image in frames]
+
+
+def box_error(reference, boxes):
+    """Center distance and IoU of the best matching box of each reference box."""
+    if len(reference) == 0:
+        return [], []
+    if len(boxes) == 0:
+        return [np.nan] * len(reference), [0.] * len(reference)
+    overlap = iou(reference, boxes)
+    best = overlap.argmax(axis=1)
+    centers = (reference[:, :2] + reference[:, 2:]) / 2
+    matched = (boxes[best, :2] + boxes[best, 2:]) / 2
+    return np.linalg.norm(centers - matched, axis=1).tolist(), overlap.max(axis=1).tolist()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('inputs', nargs='*', help='video files (default: synthetic scene)')
+    parser.add_argument('--every', type=int, nargs='+', default=[10, 30],
+                        help='frames between full detections')
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    if args.inputs:
+        frames, reference = detected_scene(args.inputs, args.frames)
+    else:
+        frames, reference = synthetic_scene(args.frames)
+
+    print(f"{'every':>6} {'mode':>6} {'ms/frame':>9} {'err px':>7} {'p95 px':>7} {'IoU':>5}")
+    for every in args.every:
+        for mode in ('hold', 'track'):
+            tracker = FaceTracker()
+            errors, ious, times = [], [], []
+            boxes = np.zeros((0, 4), dtype=int)
+            for f, image in enumerate(frames):
+                if f % every == 0:
+                    boxes = reference[f]
+                    if mode == 'track':
+                        tracker.seed(image, boxes)
+                    continue
+                if mode == 'track':
+                    t0 = time.perf_counter()
+                    boxes = tracker.update(image)
+                    times.append((time.perf_counter() - t0) * 1e3)
+                e, o = box_error(reference[f], boxes)
+                errors += e
+                ious += o
+            ms = np.mean(times) if times else 0.
+            print(f"{every:>6} {mode:>6} {ms:>9.2f} {np.nanmean(errors):>7.1f} "
+                  f"{np.nanpercentile(errors, 95):>7.1f} {np.mean(ious):>5.2f}")
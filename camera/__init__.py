@@ -1,4 +1,3 @@
-# Pick the camera capture implementation
-# ======================================
 from .camera_process_shm import Camera  # Multi-process (>=Python 3.8)
-# from .camera import Camera            # Single-process
+from .camera import LocalCamera         # Single-process
+from .sources import SOURCES, open_source
@@ -2,24 +2,29 @@
 import numpy as np
 import cv2
 
+from .sources import open_source
 
-class Camera:
+
+class LocalCamera:
+    """Camera capturing in the main process.
+
+    Args:
+        width: preferred frame width in pixels
+        height: preferred frame height in pixels
+        source: 'device', 'file' or 'synthetic' (see `camera.sources`)
+        source_options: options of the source
+    """
 
     multiprocessing = False
 
-    def __init__(self, width, height):
+    def __init__(self, width, height, source='device', source_options=None):
 
         # Preferres resolution
         self.pref_size = (width, height)
 
-        # Choose Driver Show driver and initialize
-        camera_driver = cv2.CAP_DSHOW
-        self.cap = cv2.VideoCapture(0, camera_driver)
-
-        # Set resolution
+        # Open the camera (or another source) at the preferred resolution
         # (if it isn't supported, it will take the default resolution)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(width))
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(height))
+        self.cap = open_source(source, width, height, **(source_options or dict()))
 
     def capture_frame(self):
         # Capture frame-by-frame
@@ -29,8 +34,7 @@ class Camera:
         frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
         # If size not equal to the preferred -> resize
-        if (frame.shape[0] != self.pref_size[1]) \
-            and (frame.shape[1] != self.pref_size[0]):
+        if frame.shape[1::-1] != self.pref_size:
             frame = cv2.resize(frame, self.pref_size)
 
         # Swap axes to be compatible with pygame format (width, height, channel)
@@ -38,6 +42,9 @@ class Camera:
 
         return frame
 
+    def frame_is_current(self):
+        """Checks if the last captured frame can still be shown (always)."""
+        return True
+
     def __del__(self):
         self.cap.release()
-        cv2.destroyAllWindows()
@@ -4,16 +4,91 @@ This class is based on the `shared_memory` module from `multiprocessing` (new in
 This implementation is considerably faster than the previous one using `multiprocessing.Array`.
 """
 import ctypes
+import time
+import signal
 import multiprocessing as mp
 from multiprocessing import shared_memory
 import cv2
 import numpy as np
 import logging
 
+from process import SharedTelemetry
+from .sources import open_source
+
+# Telemetry of the camera process: frames captured, failed reads,
+# capture time of the last frame, moving averages of the time between
+# frames and of the resize and color conversion time
+CAMERA_FIELDS = ('frames', 'failures', 'frame_ns', 'interval_ms', 'convert_ms')
+
+
+class CaptureStage:
+    """Reads camera frames and converts them into the shared frame buffer.
+
+    The destination buffers are allocated once: `cap.read()` reuses
+    the raw image, the frame is resized into a preallocated image
+    (if the camera does not support the preferred size) and converted
+    from BGR to RGB straight into the next slot of a row-major
+    `process.SharedFrameRing`. Other shared frames get one more copy.
+
+    Args:
+        width: preferred frame width in pixels
+        height: preferred frame height in pixels
+
+    Attributes:
+        timestamp_ns: capture time of the last frame
+    """
+    def __init__(self, width, height):
+        self.size = (width, height)
+        self.timestamp_ns = 0
+        self.raw = None
+        self.resized = None
+        self.rgb = None
+
+    def read(self, cap, shared_frame):
+        """Capture one frame and publish it.
+
+        Args:
+            cap: cv2.VideoCapture or another source (see `camera.sources`)
+            shared_frame: SharedFrameRing or SharedFrame
+
+        Return:
+            bool: False if no frame could be read
+        """
+        ret, raw = cap.read(self.raw)
+        if not ret:
+            return False
+        timestamp_ns = self.timestamp_ns = time.perf_counter_ns()
+        self.raw = raw
+
+        # If size not equal to the preferred -> resize
+        if raw.shape[1::-1] != self.size:
+            if self.resized is None:
+                self.resized = np.empty((self.size[1], self.size[0], raw.shape[2]), raw.dtype)
+            raw = cv2.resize(raw, self.size, dst=self.resized)
+
+        # BGR to RGB, written in the (height, width, channel) layout
+        if getattr(shared_frame, 'row_major', False):
+            slot, dst = shared_frame.write_slot()
+            cv2.cvtColor(raw, cv2.COLOR_BGR2RGB, dst=dst)
+            shared_frame.publish(slot, timestamp_ns)
+        else:
+            if self.rgb is None:
+                self.rgb = np.empty_like(raw)
+            cv2.cvtColor(raw, cv2.COLOR_BGR2RGB, dst=self.rgb)
+            shared_frame.put_image(self.rgb)
+        return True
+
 
 class CameraProcess(mp.Process):
+    """Process capturing the camera frames into a shared frame.
+
+    The process updates its `SharedTelemetry` record after every frame
+    (see `CAMERA_FIELDS`). The source is opened in the process
+    (see `camera.sources.open_source()`).
+    """
 
-    def __init__(self, width, height, shared_frame):
+    def __init__(self, width, height, shared_frame, telemetry,
+                 source='device', source_options=None):
         super().__init__()
         logging.debug(f"Initializing {self.name}")
 
@@ -21,54 +96,98 @@ class CameraProcess(mp.Process):
         self.pref_size = (width, height)
         self.channels = 3
 
-        # Shared memory block
+        # Frame source
+        self.source = source
+        self.source_options = source_options or dict()
+
+        # Shared memory blocks
         self.shared_frame = shared_frame
+        self.telemetry = telemetry
 
     def run(self):
         logging.debug("Run CameraProcess in a separate process")
+        # A forked process inherits the SIGTERM handler of SDL (pygame.init()),
+        # which would ignore terminate()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
         logging.debug(f"self.shared_frame: {self.shared_frame}")
 
-        # Choose Driver Show driver and initialize
-        camera_driver = cv2.CAP_DSHOW
-        cap = cv2.VideoCapture(0, camera_driver)
-
-        # Set resolution
+        # Open the camera (or another source) at the preferred resolution
         # (if it isn't supported, it will take the default resolution)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.pref_size[0])
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.pref_size[1])
+        cap = open_source(self.source, *self.pref_size, **self.source_options)
 
+        stage = CaptureStage(*self.pref_size)
+        telemetry = self.telemetry
         while True:
-            # Capture frame-by-frame
-            ret, frame = cap.read()
-
-            # BGR to RGB
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            # If size not equal to the preferred -> resize
-            if (frame.shape[0] != self.pref_size[1]) \
-                and (frame.shape[1] != self.pref_size[0]):
-                frame = cv2.resize(frame, self.pref_size)
-
-            # Swap axes to be compatible with pygame format (width, height, channel)
-            frame = np.swapaxes(frame, 0, 1)
-
-            # Write to shared memory
+            # Capture frame-by-frame and write it to shared memory
             # Lock not needed, because only one process writes to shared memory
-            self.shared_frame.put_array(frame)
+            last_ns = stage.timestamp_ns
+            if not stage.read(cap, self.shared_frame):
+                logging.warning("No frame from the camera")
+                telemetry.add('failures')
+                time.sleep(0.1)
+                continue
+
+            telemetry.add('frames')
+            telemetry.set('frame_ns', stage.timestamp_ns)
+            telemetry.average('convert_ms', (time.perf_counter_ns() - stage.timestamp_ns) / 1e6)
+            if last_ns > 0:
+                telemetry.average('interval_ms', (stage.timestamp_ns - last_ns) / 1e6)
+            telemetry.update_cpu()
 
 
 class Camera:
+    """Camera capturing in a separate process into a shared frame.
+
+    Args:
+        width: preferred frame width in pixels
+        height: preferred frame height in pixels
+        shared_frame: SharedFrameRing receiving the frames
+        source: 'device', 'file' or 'synthetic' (see `camera.sources`)
+        source_options: options of the source
+    """
 
     multiprocessing = True
 
-    def __init__(self, width, height, shared_frame):
+    def __init__(self, width, height, shared_frame, source='device', source_options=None):
         logging.debug("Initializing Camera")
-        self.cam_proc = CameraProcess(width, height, shared_frame)
+        self.telemetry = SharedTelemetry(CAMERA_FIELDS)
+        self.cam_proc = CameraProcess(width, height, shared_frame, self.telemetry,
+                                      source, source_options)
         self.cam_proc.start()
         self.shared_frame = shared_frame
+        self.frame_seq = 0
+        self.frame_timestamp_ns = 0
 
     def capture_frame(self):
-        return self.shared_frame.get_array()
+        frame, self.frame_seq, self.frame_timestamp_ns = self.shared_frame.get_latest()
+        return frame
+
+    def frame_is_current(self):
+        """Checks if the last captured frame can still be shown (not overwritten)."""
+        return self.shared_frame.is_current(self.frame_seq)
+
+    def sample_telemetry(self):
+        """Samples the health of the camera process.
+
+        `display_age_ms` is the age of the last frame returned by
+        `capture_frame()`, i.e. the capture to display latency
+        if sampled after the frame is shown.
+
+        Return:
+            dict: {name: value}
+        """
+        t = self.telemetry.sample()
+        age_ms = 0.
+        if self.frame_timestamp_ns > 0:
+            age_ms = (time.perf_counter_ns() - self.frame_timestamp_ns) / 1e6
+        return {
+            'camera_fps': 1e3 / t['interval_ms'] if t['interval_ms'] > 0 else 0.,
+            'camera_frames': t['frames'],
+            'camera_failures': t['failures'],
+            'camera_convert_ms': t['convert_ms'],
+            'camera_cpu_percent': t['cpu_percent'],
+            'display_age_ms': age_ms,
+        }
 
     def __del__(self):
         logging.debug(f"Terminating {self.cam_proc.name}")
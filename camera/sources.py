@@ -0,0 +1,216 @@
+"""Camera frame sources.
+
+Every source has the `read(image=None)` and `release()` methods
+of `cv2.VideoCapture` and returns BGR images (height, width, channel),
+so the capture code does not depend on the source:
+
+- 'device': camera device (V4L2 on Linux, DirectShow on Windows)
+  with a requested pixel format (FOURCC, e.g. MJPEG) and a driver
+  buffer of one frame, so that the newest frame is always read,
+- 'file': video file, paced in real time (at the frame rate of the file)
+  or read as fast as possible, looped at the end,
+- 'synthetic': generated frames with face-like patterns moving
+  over a textured background, at any resolution and frame rate.
+
+`open_source()` opens a source by name.
+"""
+import sys
+import time
+import logging
+
+import cv2
+import numpy as np
+
+from utils import draw_face
+
+SOURCES = ('device', 'file', 'synthetic')
+
+
+def open_device(width: int,
+                height: int,
+                index: int = 0,
+                fourcc: str = 'MJPG',
+                buffer_size: int = 1,
+                fps: float = None) -> cv2.VideoCapture:
+    """Open a camera device.
+
+    The requested settings are only hints for the driver, the settings
+    in effect are logged. If the size is not supported, the camera
+    takes the nearest (or default) one.
+
+    Args:
+        width: preferred frame width in pixels
+        height: preferred frame height in pixels
+        index: device index (/dev/video<index> on Linux)
+        fourcc: pixel format, e.g. 'MJPG' or 'YUYV' (None = default)
+        buffer_size: number of frames buffered by the driver
+        fps: requested frame rate (None = default)
+
+    Return:
+        cv2.VideoCapture
+    """
+    if sys.platform.startswith('linux'):
+        api = cv2.CAP_V4L2
+    elif sys.platform == 'win32':
+        api = cv2.CAP_DSHOW
+    else:
+        api = cv2.CAP_ANY
+    cap = cv2.VideoCapture(index, api)
+
+    # The pixel format goes first, it limits the sizes and frame rates
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    if buffer_size:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+    code = int(cap.get(cv2.CAP_PROP_FOURCC))
+    actual = ''.join(chr((code >> 8 * k) & 0xFF) for k in range(4))
+    logging.info(f"Camera {index}: {int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x"
+                 f"{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))} {actual!r} "
+                 f"{cap.get(cv2.CAP_PROP_FPS):.0f} fps "
+                 f"(requested {width}x{height} {fourcc!r})")
+    return cap
+
+
+class Pacer:
+    """Waits for the due time of each frame.
+
+    A source falling behind by more than one frame restarts the schedule
+    instead of delivering the late frames in a burst.
+
+    Args:
+        fps: frame rate
+        realtime: wait for the frames (if False, never waits)
+    """
+    def __init__(self, fps: float, realtime: bool = True):
+        self.period = 1. / fps if realtime and fps > 0 else 0.
+        self.next_time = None
+
+    def wait(self) -> None:
+        """Sleep until the next frame is due."""
+        if self.period == 0.:
+            return
+        now = time.perf_counter()
+        if self.next_time is None or now - self.next_time > self.period:
+            self.next_time = now
+        elif self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time += self.period
+
+
+class FileSource:
+    """Video file as a camera.
+
+    Args:
+        path: video file
+        pacing: 'realtime' (frame rate of the file) or 'fastest'
+        loop: start again at the end of the file
+    """
+    def __init__(self, path: str, pacing: str = 'realtime', loop: bool = True):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.
+        self.pacer = Pacer(fps, pacing == 'realtime')
+        self.loop = loop
+        logging.info(f"Camera frames from {path} ({fps:.0f} fps, {pacing})")
+
+    def read(self, image=None):
+        self.pacer.wait()
+        ret, image = self.cap.read(image)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, image = self.cap.read(image)
+        return ret, image
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticSource:
+    """Generated camera frames with moving faces.
+
+    The faces bounce off the frame edges. The background is generated
+    once, each frame is a copy of it with the faces drawn on top.
+
+    Args:
+        width: frame width in pixels
+        height: frame height in pixels
+        fps: frame rate
+        n_faces: number of faces
+        pacing: 'realtime' (`fps`) or 'fastest'
+        speed: face speed in pixels per frame
+        seed: random seed of the background and the faces
+    """
+    def __init__(self,
+                 width: int,
+                 height: int,
+                 fps: float = 30.,
+                 n_faces: int = 1,
+                 pacing: str = 'realtime',
+                 speed: float = 4.,
+                 seed: int = 0):
+
+        rng = np.random.RandomState(seed)
+        self.size = (width, height)
+        self.background = cv2.GaussianBlur(
+            rng.randint(60, 200, (height, width, 3), dtype=np.uint8), (0, 0), 5)
+        self.face_size = max(min(width, height) // 4, 8)
+        margin = self.face_size
+        self.centers = rng.uniform((margin, margin), (width - margin, height - margin),
+                                   (n_faces, 2))
+        angle = rng.uniform(0, 2 * np.pi, n_faces)
+        self.velocity = speed * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+        self.low = np.array([margin // 2, margin * 2 // 3])
+        self.high = np.array(self.size) - self.low
+        self.pacer = Pacer(fps, pacing == 'realtime')
+        logging.info(f"Synthetic camera frames: {width}x{height}, {n_faces} faces, "
+                     f"{fps:.0f} fps ({pacing})")
+
+    def read(self, image=None):
+        self.pacer.wait()
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        image[:] = self.background
+
+        self.centers += self.velocity
+        bounce = (self.centers < self.low) | (self.centers > self.high)
+        self.velocity[bounce] *= -1
+        self.centers = np.clip(self.centers, self.low, self.high)
+        for cx, cy in self.centers.astype(int).tolist():
+            draw_face(image, (cx, cy), self.face_size, bgr=True)
+        return True, image
+
+    def release(self):
+        pass
+
+
+def open_source(name: str, width: int, height: int, **options):
+    """Open a frame source.
+
+    Args:
+        name: 'device', 'file' or 'synthetic'
+        width: preferred frame width in pixels
+        height: preferred frame height in pixels
+        options: options of the source (unknown ones are ignored):
+            'device': index, fourcc, buffer_size, fps;
+            'file': path, pacing, loop;
+            'synthetic': fps, n_faces, pacing, speed, seed
+
+    Return:
+        source with the `read()` and `release()` methods of `cv2.VideoCapture`
+    """
+    def pick(*keys):
+        return {k: options[k] for k in keys if options.get(k) is not None}
+
+    if name == 'device':
+        return open_device(width, height, **pick('index', 'fourcc', 'buffer_size', 'fps'))
+    if name == 'file':
+        return FileSource(options['path'], **pick('pacing', 'loop'))
+    if name == 'synthetic':
+        return SyntheticSource(width, height, **pick('fps', 'n_faces', 'pacing', 'speed', 'seed'))
+    raise ValueError(f"Unknown camera source '{name}', choose from {list(SOURCES)}")
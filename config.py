@@ -2,10 +2,54 @@ CONFIG = dict()
 
 CONFIG['fps'] = 60
 CONFIG['n_balls'] = 50
+CONFIG['ball_capacity'] = 256  # Preallocated balls (grows when full)
+CONFIG['openings'] = []  # Openings in the screen edges, e.g. [('bottom', 300, 500)]
 CONFIG['dissipation'] = 0.1
+CONFIG['sleep_velocity'] = 0.05  # Balls slower than this (px/frame)...
+CONFIG['sleep_frames'] = 60  # ...for this many frames fall asleep
+CONFIG['physics_workers'] = 0  # 0 = single-process physics, N = ParallelBallSystem with N workers (fixed set of balls: no openings, no bursts)
 CONFIG['screen_width'] = 800
 CONFIG['screen_height'] = 600
 CONFIG['n_channels'] = 3
+CONFIG['frame_slots'] = 6  # Slots of the shared camera frame ring buffer (the face tracker starts from the frame of a detection while it is in the ring)
+CONFIG['camera_source'] = 'device'  # 'device' (V4L2/DirectShow camera), 'file' (video) or 'synthetic'
+CONFIG['camera_options'] = {  # Options of the camera source (see camera.sources.open_source)
+    'index': 0,  # Camera device index
+    'fourcc': 'MJPG',  # Pixel format requested from the camera
+    'buffer_size': 1,  # Frames buffered by the camera driver (1 = always the newest)
+    'path': None,  # Video file of the 'file' source
+    'pacing': 'realtime',  # 'realtime' or 'fastest' for the 'file' and 'synthetic' sources
+    'n_faces': 2  # Faces of the 'synthetic' source
+}
+CONFIG['camera_multiprocessing'] = True  # Capture in a separate process (shared memory)
+CONFIG['detection_multiprocessing'] = True  # Detect faces in separate processes (needs the above)
+CONFIG['face_backend'] = 'auto'  # 'dlib_hog', 'opencv_haar', 'opencv_dnn' or 'auto' (best within the budget)
+CONFIG['face_backend_options'] = {
+    'dnn_model': 'models/res10_300x300_ssd_iter_140000.caffemodel',
+    'dnn_config': 'models/deploy.prototxt'
+}
+CONFIG['detection_budget_ms'] = 50  # Latency budget of one detection for the 'auto' backend
+CONFIG['detection_rate'] = 10  # Face detections per second (0 = as fast as possible)
+CONFIG['detection_scale'] = 1.  # Downscaling of the frames before face detection (e.g. 0.5)
+CONFIG['detection_upsample'] = 0  # Upsampling by the dlib detector (finds smaller faces, 4x slower each)
+CONFIG['detection_grayscale'] = True  # Detect faces on grayscale frames
+CONFIG['face_tracking'] = True  # Follow the faces with optical flow between detections
+CONFIG['detection_workers'] = 0  # Face detector processes (0 = os.cpu_count())
+CONFIG['detection_roi_every'] = 10  # Scan only around the known faces, full frame every N detections (0 = off)
+CONFIG['max_faces'] = 16  # Capacity of the shared detection record and number of face walls
+CONFIG['dirty_rects'] = False  # Update only the changed regions of the screen
+CONFIG['profile'] = False  # Measure the time of each stage of the main loop
+CONFIG['profile_overlay'] = True  # Show the rolling p50/p95/p99 on the screen (if profiling)
+CONFIG['profile_output'] = None  # Stream the stage times to a .csv or .jsonl file (if profiling)
+CONFIG['profile_window'] = 300  # Frames of the rolling statistics
+CONFIG['quality_governor'] = False  # Lower the quality step by step when the frame time exceeds the budget
+CONFIG['governor_window'] = 30  # Frames of the mean work time compared with the budget
+CONFIG['governor_cooldown'] = 60  # Frames after a quality change before the next one
+CONFIG['governor_max_awake'] = 100  # Maximum number of awake balls at the lowest quality
+CONFIG['seed'] = None  # Random seed of the world (None = not seeded, drawn when recording)
+CONFIG['record'] = None  # Directory receiving the recorded session inputs (see `replay`)
+CONFIG['record_video'] = False  # Also record the camera frames (compressed video)
+CONFIG['replay'] = None  # Directory of a recorded session to replay (no camera needed)
 CONFIG['colors'] = {
     'white': (255, 255, 255),
     'red': (255, 0, 0),
@@ -1,4 +1,3 @@
-# Pick the face detection implementation
-# ======================================
-from .dlib_process import FaceDetector  # Multi-process (>=Python 3.8)
-# from .dlib import FaceDetector        # Single-process
+from .backends import BACKENDS, register_backend, available_backends, create_backend, resolve_backend
+from .detector_process import FaceDetector  # Multi-process (>=Python 3.8)
+from .detector import LocalFaceDetector     # Single-process
@@ -0,0 +1,230 @@
+"""Face detection backends.
+
+Every backend takes an image (height, width[, channel]) in the format
+produced by `face.preprocess.prepare_image()` (grayscale or RGB) and
+returns the boxes as an int array of [left, top, right, bottom]
+in the image coordinates.
+
+Backends are registered by name in `BACKENDS`:
+
+- 'dlib_hog': dlib HOG + linear SVM frontal face detector
+- 'opencv_haar': OpenCV Haar cascade (bundled with opencv-python)
+- 'opencv_dnn': OpenCV DNN with a local Caffe SSD model
+  (e.g. res10_300x300_ssd_iter_140000.caffemodel and deploy.prototxt)
+
+With the name 'auto', `resolve_backend()` times every available backend
+on synthetic frames and picks the best one (in the `PREFERENCE` order)
+within a latency budget.
+"""
+import os
+import time
+import logging
+
+import cv2
+import numpy as np
+
+from utils import synthetic_frame
+from .preprocess import prepare_image
+
+BACKENDS = dict()
+
+# Order of the 'auto' choice, best detection quality first
+# (backends not listed come last, in the registration order)
+PREFERENCE = ('opencv_dnn', 'dlib_hog', 'opencv_haar')
+
+
+def register_backend(name: str):
+    """Class decorator adding a backend to `BACKENDS`."""
+    def register(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return register
+
+
+def as_boxes(boxes) -> np.ndarray:
+    """Return boxes as an int array (n, 4)."""
+    return np.asarray(boxes, dtype=int).reshape(-1, 4)
+
+
+@register_backend('dlib_hog')
+class DlibHogBackend:
+    """dlib HOG face detector.
+
+    Args:
+        upsample: number of times the image is upsampled (finds smaller faces)
+    """
+    color = False
+
+    def __init__(self, upsample: int = 0, **options):
+        import dlib
+        self.detector = dlib.get_frontal_face_detector()
+        self.upsample = upsample
+
+    @staticmethod
+    def available(**options) -> bool:
+        try:
+            import dlib
+        except ImportError:
+            return False
+        return True
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        dets = self.detector(image, self.upsample)
+        return as_boxes([[d.left(), d.top(), d.right(), d.bottom()] for d in dets])
+
+
+@register_backend('opencv_haar')
+class HaarBackend:
+    """OpenCV Haar cascade face detector.
+
+    Args:
+        cascade: cascade file (default: frontal face cascade of OpenCV)
+        scale_factor: scale step of the image pyramid
+        min_neighbors: minimum number of overlapping candidates
+        min_size: minimum face size in pixels
+    """
+    color = False
+
+    def __init__(self,
+                 cascade: str = None,
+                 scale_factor: float = 1.1,
+                 min_neighbors: int = 5,
+                 min_size: int = 40,
+                 **options):
+        self.classifier = cv2.CascadeClassifier(cascade or self.default_cascade())
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = (min_size, min_size)
+
+    @staticmethod
+    def default_cascade() -> str:
+        return os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+
+    @staticmethod
+    def available(cascade: str = None, **options) -> bool:
+        path = cascade or (HaarBackend.default_cascade() if hasattr(cv2, 'data') else '')
+        return os.path.isfile(path)
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        rects = self.classifier.detectMultiScale(image, self.scale_factor,
+                                                 self.min_neighbors, minSize=self.min_size)
+        boxes = as_boxes(rects)
+        boxes[:, 2:] += boxes[:, :2]
+        return boxes
+
+
+@register_backend('opencv_dnn')
+class DnnBackend:
+    """OpenCV DNN face detector (Caffe SSD model).
+
+    Args:
+        dnn_model: weights file (.caffemodel)
+        dnn_config: network file (.prototxt)
+        confidence: minimum detection confidence
+        input_size: network input size in pixels
+    """
+    color = True
+
+    def __init__(self,
+                 dnn_model: str = None,
+                 dnn_config: str = None,
+                 confidence: float = 0.5,
+                 input_size: int = 300,
+                 **options):
+        self.net = cv2.dnn.readNetFromCaffe(dnn_config, dnn_model)
+        self.confidence = confidence
+        self.input_size = (input_size, input_size)
+
+    @staticmethod
+    def available(dnn_model: str = None, dnn_config: str = None, **options) -> bool:
+        return bool(dnn_model and dnn_config
+                    and os.path.isfile(dnn_model) and os.path.isfile(dnn_config))
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        # The model expects BGR with the mean of its training set subtracted
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR if image.ndim == 2 else cv2.COLOR_RGB2BGR)
+        height, width = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(image, 1., self.input_size, (104., 177., 123.))
+        self.net.setInput(blob)
+        out = self.net.forward()[0, 0]
+        out = out[out[:, 2] >= self.confidence]
+        boxes = np.rint(out[:, 3:7] * [width, height, width, height])
+        boxes = np.clip(boxes, 0, [width, height, width, height])
+        return as_boxes(boxes)
+
+
+def available_backends(**options) -> list:
+    """Return the names of the backends which can be used."""
+    return [name for name, cls in BACKENDS.items() if cls.available(**options)]
+
+
+def create_backend(name: str, **options):
+    """Create the backend `name` with its options (others are ignored)."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown face detection backend '{name}', "
+                         f"choose from {list(BACKENDS)}")
+    return BACKENDS[name](**options)
+
+
+def benchmark_backend(backend, frames: list) -> float:
+    """Return the median detection time (ms) of the backend on the frames."""
+    backend.detect(frames[0])
+    times = []
+    for image in frames:
+        t0 = time.perf_counter()
+        backend.detect(image)
+        times.append((time.perf_counter() - t0) * 1e3)
+    return float(np.median(times))
+
+
+def resolve_backend(name: str,
+                    options: dict,
+                    frame_size: tuple,
+                    scale: float = 1.,
+                    grayscale: bool = True,
+                    budget_ms: float = 50.,
+                    n_frames: int = 5) -> str:
+    """Return the backend to use.
+
+    For 'auto', every available backend is timed on synthetic frames
+    preprocessed like the camera frames, and the first one in the
+    `PREFERENCE` order within `budget_ms` is chosen (the fastest one
+    if none is).
+
+    Args:
+        name: backend name or 'auto'
+        options: backend options
+        frame_size: camera frame size (width, height)
+        scale: downscaling factor applied before the detection
+        grayscale: detect on the grayscale image
+        budget_ms: latency budget of one detection
+        n_frames: number of timed frames per backend
+
+    Return:
+        str: backend name
+    """
+    if name != 'auto':
+        return name
+
+    rgb = [synthetic_frame(*frame_size, seed=k) for k in range(n_frames)]
+    timings = dict()
+    for candidate in available_backends(**options):
+        backend = create_backend(candidate, **options)
+        frames = [prepare_image(f, scale, grayscale and not backend.color) for f in rgb]
+        timings[candidate] = benchmark_backend(backend, frames)
+    if not timings:
+        raise RuntimeError("No face detection backend is available")
+
+    report = ', '.join(f"{k} {v:.1f} ms" for k, v in sorted(timings.items(), key=lambda kv: kv[1]))
+    order = [k for k in PREFERENCE if k in timings] + [k for k in timings if k not in PREFERENCE]
+    within = [k for k in order if timings[k] <= budget_ms]
+    if within:
+        chosen = within[0]
+    else:
+        chosen = min(timings, key=timings.get)
+        logging.warning(f"No face detection backend within {budget_ms} ms")
+    logging.info(f"Face detection backend: {chosen} (budget {budget_ms} ms; {report})")
+    return chosen
@@ -0,0 +1,68 @@
+import numpy as np
+
+from .backends import create_backend, resolve_backend
+from .preprocess import detect_faces
+from .tracker import FaceTracker
+
+
+class LocalFaceDetector:
+    """Face detector running in the main process (every `skip_frames` frames).
+
+    Args:
+        backend: detection backend name, or 'auto' to pick the best
+            one within `budget_ms` (see `face.backends.resolve_backend()`)
+        backend_options: options of the backends
+        budget_ms: latency budget for the 'auto' backend choice
+        scale: downscaling factor applied before the detection
+        grayscale: detect on the grayscale image (unless the backend needs colors)
+        tracking: follow the faces in the frames between detections
+            (`face.tracker.FaceTracker`)
+    """
+
+    multiprocessing = False
+
+    def __init__(self, backend='auto', backend_options=None, budget_ms=50.,
+                 scale=1., grayscale=True, tracking=False):
+        self.multiprocessing = False
+        self.backend = backend
+        self.backend_options = backend_options or dict()
+        self.budget_ms = budget_ms
+        self.detector = None
+        self.skip_frames = self.nominal_skip_frames = 30
+        self.frame_counter = 0
+        self.prev_dets = np.array([])
+        self.scale = scale
+        self.grayscale = grayscale
+        self.tracker = FaceTracker() if tracking else None
+
+    def throttle(self, factor):
+        """Lowers the detection rate to `factor` times the full rate."""
+        self.skip_frames = max(1, round(self.nominal_skip_frames / factor))
+
+    def detect(self, frame):
+        if self.detector is None:
+            # The frame size is known now
+            self.backend = resolve_backend(self.backend, self.backend_options,
+                                           frame.shape[:2], self.scale, self.grayscale,
+                                           self.budget_ms)
+            self.detector = create_backend(self.backend, **self.backend_options)
+
+        self.frame_counter += 1
+
+        if self.frame_counter >= self.skip_frames:
+            self.frame_counter = 0
+            # Swap axes to be compatible with the image format and detect
+            dets = detect_faces(self.detector, np.swapaxes(frame, 0, 1),
+                                self.scale, self.grayscale)
+            # Save dets to buffer
+            self.prev_dets = dets
+            if self.tracker is not None:
+                self.tracker.seed(np.swapaxes(frame, 0, 1), dets)
+        elif self.tracker is not None:
+            # Follow the faces
+            dets = self.prev_dets = self.tracker.update(np.swapaxes(frame, 0, 1))
+        else:
+            # Return previous detections
+            dets = self.prev_dets
+
+        return dets
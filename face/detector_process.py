@@ -0,0 +1,334 @@
+import os
+import time
+import signal
+import logging
+import multiprocessing as mp
+from multiprocessing import Process
+import numpy as np
+
+from process import SharedDetections, SharedTelemetry
+from .backends import create_backend, resolve_backend
+from .preprocess import prepare_image, scale_boxes
+from .roi import RoiDetector
+from .tracker import FaceTracker
+
+# Telemetry of a detector process: detections, frames overwritten while
+# reading them, end time of the last detection, moving averages of
+# the detection time and of the time from the frame capture to the result
+DETECTOR_FIELDS = ('detections', 'stale', 'done_ns', 'detect_ms', 'latency_ms')
+
+
+class FrameClaim:
+    """Hands out the newest camera frames to the detector processes.
+
+    A process claims the newest frame before waiting for its start
+    time, so the other processes wait for the next frame instead of
+    detecting the same one. The start times of the detections of all
+    processes together keep the target rate.
+
+    Args:
+        rate: target number of detections per second (0 = no limit)
+    """
+    def __init__(self, rate=0.):
+        self.lock = mp.Lock()
+        self.seq = mp.Value('q', 0, lock=False)
+        self.next_time = mp.Value('d', 0., lock=False)
+        self.period = mp.Value('d', 0., lock=False)
+        self.runs = mp.Value('q', 0, lock=False)
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        """Changes the target rate (also while the processes run)."""
+        self.period.value = 1. / rate if rate > 0 else 0.
+
+    def reserve(self):
+        """Reserves the next detection start time and waits for it."""
+        with self.lock:
+            start = max(self.next_time.value, time.perf_counter())
+            self.next_time.value = start + self.period.value
+        delay = start - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def claim(self, seq):
+        """Claims the frame `seq`, False if it (or a newer one) was already claimed."""
+        with self.lock:
+            if seq <= self.seq.value:
+                return False
+            self.seq.value = seq
+            return True
+
+    def next_run(self):
+        """Counts a detection of the pool and returns its number (from 1)."""
+        with self.lock:
+            self.runs.value += 1
+            return self.runs.value
+
+    @property
+    def claimed(self):
+        """Sequence number of the newest claimed frame."""
+        return self.seq.value
+
+
+class FaceDetectorProcess(Process):
+    """Process detecting faces in the frames of a `SharedFrameRing`.
+
+    Detection is driven by the camera: the process sleeps until a new
+    frame is published and then detects on the newest frame. Several
+    processes can share the work through a `FrameClaim`, which also
+    keeps the target rate (with `rate=0` they detect as fast as possible).
+    The frame is preprocessed as in `face.preprocess.detect_faces()`.
+    With `roi_every > 0` only the regions around the faces of the newest
+    result of the pool are scanned, except every `roi_every` detections
+    of the pool (`face.roi.RoiDetector`), so that all processes crop
+    around the same faces.
+    The process updates its `SharedTelemetry` record after every
+    detection (see `DETECTOR_FIELDS`).
+
+    Args:
+        shared_frame: SharedFrameRing written by the camera process
+        detections: SharedDetections receiving the results of this process
+        telemetry: SharedTelemetry of this process
+        claim: FrameClaim shared by the detector processes
+        backend: name of the detection backend (see `face.backends`)
+        backend_options: options of the backend
+        scale: downscaling factor applied before the detection
+        grayscale: detect on the grayscale image (unless the backend needs colors)
+        roi_every: full-frame scan every `roi_every` runs (0 = always)
+        pool_detections: SharedDetections of all processes of the pool
+            (default: only `detections`)
+    """
+    def __init__(self, shared_frame, detections, telemetry, claim, backend, backend_options,
+                 scale=1., grayscale=True, roi_every=0, pool_detections=None):
+        super().__init__()
+        self.telemetry = telemetry
+        self.claim = claim
+        self.backend = backend
+        self.backend_options = backend_options
+        self.roi_every = roi_every
+        self.scale = scale
+        self.grayscale = grayscale
+        self.shared_frame = shared_frame
+        self.detections = detections
+        self.pool_detections = pool_detections or [detections]
+
+    def newest_boxes(self):
+        """Return the boxes of the newest result of the pool (full resolution)."""
+        newest = max((d.read() for d in self.pool_detections), key=lambda r: r[1])
+        return newest[0]
+
+    def run(self):
+        logging.debug(f"{self.name} started")
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)  # see CameraProcess.run()
+        backend = create_backend(self.backend, **self.backend_options)
+        grayscale = self.grayscale and not backend.color
+        run = backend.detect
+        roi = RoiDetector(run, full_every=self.roi_every) if self.roi_every > 0 else None
+        telemetry = self.telemetry
+
+        while True:
+            # Sleep until the camera publishes a frame nobody has claimed
+            if not self.shared_frame.wait_newer(self.claim.claimed, timeout=1.):
+                continue
+
+            if not self.claim.claim(self.shared_frame.seq):
+                continue
+
+            # Keep the target rate
+            self.claim.reserve()
+
+            # Preprocess the newest frame in the dlib format (height, width, channel)
+            start_ns = time.perf_counter_ns()
+            frame, seq, frame_timestamp_ns = self.shared_frame.get_latest()
+            self.claim.claim(seq)
+            image = prepare_image(np.swapaxes(frame, 0, 1), self.scale, grayscale)
+            if not self.shared_frame.is_current(seq):
+                # Overwritten while reading
+                telemetry.add('stale')
+                continue
+
+            # Detect and convert to the full resolution
+            if roi is not None:
+                boxes = scale_boxes(self.newest_boxes(), 1. / self.scale)
+                full = self.claim.next_run() % self.roi_every == 0
+                dets = roi.detect(image, boxes, full)
+            else:
+                dets = run(image)
+            dets = scale_boxes(dets, self.scale)
+            logging.debug(f"Detections: {dets.tolist()}")
+            # Publish as the newest detections of this process
+            done_ns = time.perf_counter_ns()
+            self.detections.write(dets, seq, frame_timestamp_ns, done_ns)
+
+            telemetry.add('detections')
+            telemetry.set('done_ns', done_ns)
+            telemetry.average('detect_ms', (done_ns - start_ns) / 1e6)
+            telemetry.average('latency_ms', (done_ns - frame_timestamp_ns) / 1e6)
+            telemetry.update_cpu()
+
+
+class FaceDetector:
+    """Face detector running in a pool of separate processes.
+
+    Each process publishes its results in its own `SharedDetections`
+    record. The newest result by frame sequence number is used, so
+    a slow process never replaces newer detections with older ones.
+
+    Args:
+        shared_frame: SharedFrameRing written by the camera process
+        rate: target number of detections per second (0 = no limit)
+        capacity: maximum number of detected faces
+        backend: detection backend name, or 'auto' to pick the best
+            one within `budget_ms` (see `face.backends.resolve_backend()`)
+        backend_options: options of the backends
+            (e.g. `upsample` of 'dlib_hog', model files of 'opencv_dnn')
+        budget_ms: latency budget for the 'auto' backend choice
+        scale: downscaling factor applied before the detection
+        grayscale: detect on the grayscale image (unless the backend needs colors)
+        tracking: follow the faces in every frame between detections
+            (`face.tracker.FaceTracker`)
+        roi_every: scan only around the previous faces, except every
+            `roi_every` detections (0 = always scan the full frame)
+        n_workers: number of detector processes (default `os.cpu_count()`)
+
+    Attributes:
+        backend: name of the backend in use
+        frame_seq: sequence number of the frame of the current detections
+        detection_ms: time from the frame capture to the end of the detection
+        latency_ms: age of the current detections (time since the frame capture)
+        n_results: number of detection results used so far
+    """
+
+    multiprocessing = True
+
+    def __init__(self, shared_frame, rate=0., capacity=16,
+                 backend='auto', backend_options=None, budget_ms=50.,
+                 scale=1., grayscale=True, tracking=False, roi_every=0,
+                 n_workers=None):
+        logging.debug("Initializing FaceDetector")
+        backend_options = backend_options or dict()
+        self.backend = resolve_backend(backend, backend_options,
+                                       (shared_frame.width, shared_frame.height),
+                                       scale, grayscale, budget_ms)
+        self.shared_frame = shared_frame
+        self.tracker = FaceTracker() if tracking else None
+        self.tracked_seq = 0
+        n_workers = n_workers if n_workers else os.cpu_count()
+        self.rate = rate
+        self.claim = claim = FrameClaim(rate)
+        self.detections = [SharedDetections(capacity) for _ in range(n_workers)]
+        self.telemetry = [SharedTelemetry(DETECTOR_FIELDS) for _ in range(n_workers)]
+        self.face_det_procs = [
+            FaceDetectorProcess(shared_frame, d, t, claim, self.backend, backend_options,
+                                scale, grayscale, roi_every, self.detections)
+            for d, t in zip(self.detections, self.telemetry)
+        ]
+        for p in self.face_det_procs:
+            p.start()
+        self.dets = np.zeros((0, 4), dtype=int)
+        self.versions = [0] * n_workers
+        self.frame_seq = 0
+        self.frame_timestamp_ns = 0
+        self.detection_ms = 0.
+        self.latency_ms = 0.
+        self.n_results = 0
+
+    def _read_newest(self):
+        """Return the newest unseen result (or None)."""
+        newest = None
+        for k, d in enumerate(self.detections):
+            if d.version == self.versions[k]:
+                continue
+            result = d.read()
+            self.versions[k] = result[-1]
+            if result[1] > self.frame_seq and (newest is None or result[1] > newest[1]):
+                newest = result
+        return newest
+
+    def detect(self, frame):
+        """Return the newest detections.
+
+        Args:
+            frame: current camera frame (width, height, channel),
+                used only for tracking
+
+        Return:
+            np.ndarray: detections, array of [left, top, right, bottom]
+        """
+        seq = self.shared_frame.seq
+        result = self._read_newest()
+        if result is not None:
+            self.dets, self.frame_seq, self.frame_timestamp_ns, timestamp_ns, _ = result
+            self.detection_ms = (timestamp_ns - self.frame_timestamp_ns) / 1e6
+            self.n_results += 1
+            if self.tracker is not None:
+                self._seed_tracker(frame, seq)
+        elif self.tracker is not None and seq != self.tracked_seq:
+            # New camera frame
+            self.dets = self.tracker.update(np.swapaxes(frame, 0, 1))
+        self.tracked_seq = seq
+        if self.frame_seq > 0:
+            self.latency_ms = (time.perf_counter_ns() - self.frame_timestamp_ns) / 1e6
+        return self.dets
+
+    def _seed_tracker(self, frame, seq):
+        """Seeds the tracker with the new detections and tracks them to the frame `seq`.
+
+        The detections belong to the older frame `frame_seq`, so the tracker
+        starts from that frame and follows the boxes through the newer frames
+        still in the ring. If the source frame has been overwritten, the
+        tracker keeps following its boxes until the next detection (unless
+        it has none yet, then it starts from the current frame).
+        """
+        source = self.shared_frame.get_frame(self.frame_seq)
+        if source is not None:
+            source = np.swapaxes(source, 0, 1).copy()
+        if source is not None and self.shared_frame.is_current(self.frame_seq):
+            self.tracker.seed(source, self.dets)
+            for s in range(self.frame_seq + 1, seq + 1):
+                newer = self.shared_frame.get_frame(s)
+                if newer is not None:
+                    self.dets = self.tracker.update(np.swapaxes(newer, 0, 1))
+            return
+        if self.tracker.prev is None:
+            self.tracker.seed(np.swapaxes(frame, 0, 1), self.dets)
+        else:
+            self.dets = self.tracker.boxes
+
+    def throttle(self, factor):
+        """Lowers the detection rate to `factor` times the target rate.
+
+        Without a target rate (`rate=0`) the processes keep detecting
+        as fast as possible.
+        """
+        self.claim.set_rate(self.rate * factor)
+
+    def sample_telemetry(self):
+        """Samples the health of the detector processes.
+
+        The counters and the CPU load are summed over the processes,
+        the detection time and latency are averaged over the processes
+        which have detected. `boxes_age_ms` and `boxes_frame_lag` tell how
+        stale the current detections are (time and number of camera
+        frames since their source frame).
+
+        Return:
+            dict: {name: value}
+        """
+        samples = [t.sample() for t in self.telemetry]
+        active = [t for t in samples if t['detections'] > 0] or samples
+        return {
+            'detector_detections': sum(t['detections'] for t in samples),
+            'detector_stale': sum(t['stale'] for t in samples),
+            'detector_ms': float(np.mean([t['detect_ms'] for t in active])),
+            'detector_latency_ms': float(np.mean([t['latency_ms'] for t in active])),
+            'detector_cpu_percent': sum(t['cpu_percent'] for t in samples),
+            'boxes_age_ms': self.latency_ms,
+            'boxes_frame_lag': self.shared_frame.seq - self.frame_seq if self.frame_seq > 0 else 0,
+        }
+
+    def __del__(self):
+        for p in self.face_det_procs:
+            logging.debug(f"Terminating {p.name}")
+            p.terminate()
+            p.join()
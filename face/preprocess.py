@@ -0,0 +1,60 @@
+"""Preprocessing of the camera frames for face detection.
+
+Detection time grows with the number of pixels. The frame can be
+converted to grayscale (HOG and Haar features use the intensity
+anyway) and downscaled before the detection. The dlib detector can
+then upsample the image again to find small faces, and the boxes
+are mapped back to the full frame resolution.
+"""
+import cv2
+import numpy as np
+
+
+def prepare_image(image: np.ndarray,
+                  scale: float = 1.,
+                  grayscale: bool = True) -> np.ndarray:
+    """Return a new image ready for detection.
+
+    Args:
+        image: RGB image (height, width, channel), e.g. a view of
+            a shared frame slot (it is not modified)
+        scale: downscaling factor (e.g. 0.5 halves the width and height)
+        grayscale: convert to grayscale
+
+    Return:
+        np.ndarray
+    """
+    source = image
+    image = np.ascontiguousarray(image)
+    if grayscale:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    if scale != 1.:
+        height, width = image.shape[:2]
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return image.copy() if image is source else image
+
+
+def detect_faces(backend,
+                 image: np.ndarray,
+                 scale: float = 1.,
+                 grayscale: bool = True) -> np.ndarray:
+    """Detect faces in the image.
+
+    Args:
+        backend: detection backend (see `face.backends`)
+        image: RGB image (height, width, channel)
+        scale: downscaling factor applied before the detection
+        grayscale: detect on the grayscale image (unless the backend needs colors)
+
+    Return:
+        np.ndarray: boxes in the full resolution, array of [left, top, right, bottom]
+    """
+    image = prepare_image(image, scale, grayscale and not backend.color)
+    return scale_boxes(backend.detect(image), scale)
+
+
+def scale_boxes(boxes, scale: float) -> np.ndarray:
+    """Map boxes found in an image downscaled by `scale` to the full resolution."""
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    return np.rint(boxes / scale).astype(int)
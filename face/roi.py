@@ -0,0 +1,95 @@
+"""Detection in regions of interest around the known faces.
+
+Faces move only a little between two detections, so the detector
+can scan padded crops around the previous boxes instead of the whole
+frame. Overlapping crops are merged into one, so nearby faces are
+found with a single detector call (dlib cannot batch several images).
+A full-frame scan is still done every `full_every` runs to pick up
+new faces, and whenever a crop scan finds fewer faces than before.
+"""
+import numpy as np
+
+
+def merge_rects(rects: np.ndarray) -> np.ndarray:
+    """Merge overlapping rectangles [left, top, right, bottom] into their unions."""
+    rects = [r for r in np.asarray(rects).reshape(-1, 4)]
+    merged = True
+    while merged:
+        merged = False
+        for a in range(len(rects)):
+            for b in range(a + 1, len(rects)):
+                ra, rb = rects[a], rects[b]
+                if ra[0] < rb[2] and rb[0] < ra[2] and ra[1] < rb[3] and rb[1] < ra[3]:
+                    rects[a] = np.concatenate([np.minimum(ra[:2], rb[:2]),
+                                               np.maximum(ra[2:], rb[2:])])
+                    del rects[b]
+                    merged = True
+                    break
+            if merged:
+                break
+    return np.array(rects, dtype=int).reshape(-1, 4)
+
+
+class RoiDetector:
+    """Runs a detector on crops around the previous detections.
+
+    Args:
+        run: function returning the boxes found in an image,
+            array of [left, top, right, bottom]
+        pad: padding of the crops as a fraction of the box size
+        full_every: scan the full frame every `full_every` runs
+
+    Attributes:
+        boxes: boxes of the last run (image coordinates)
+        full_scans: number of full-frame scans
+        roi_scans: number of runs using the crops only
+    """
+    def __init__(self, run, pad: float = 0.5, full_every: int = 10):
+        self.run = run
+        self.pad = pad
+        self.full_every = full_every
+        self.boxes = np.zeros((0, 4), dtype=int)
+        self.runs = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+
+    def crops(self, shape: tuple) -> np.ndarray:
+        """Padded and merged crops around the boxes, clipped to the image."""
+        height, width = shape[:2]
+        size = self.boxes[:, 2:] - self.boxes[:, :2]
+        pad = np.rint(size * self.pad).astype(int)
+        rects = np.concatenate([self.boxes[:, :2] - pad, self.boxes[:, 2:] + pad], axis=1)
+        rects = np.clip(rects, 0, [width, height, width, height])
+        return merge_rects(rects)
+
+    def detect(self, image: np.ndarray, boxes: np.ndarray = None, full: bool = None) -> np.ndarray:
+        """Detect faces, in the crops if possible.
+
+        Args:
+            image: image (height, width[, channel])
+            boxes: known faces to crop around, in the image coordinates
+                (default: the boxes of the last run)
+            full: scan the full frame (default: every `full_every` runs)
+
+        Return:
+            np.ndarray: boxes in the image coordinates, array of [left, top, right, bottom]
+        """
+        self.runs += 1
+        if boxes is not None:
+            self.boxes = np.asarray(boxes, dtype=int).reshape(-1, 4)
+        if full is None:
+            full = self.runs % self.full_every == 0
+        if len(self.boxes) > 0 and not full:
+            found = []
+            for left, top, right, bottom in self.crops(image.shape):
+                boxes = self.run(image[top:bottom, left:right])
+                found.append(boxes + [left, top, left, top])
+            boxes = np.concatenate(found)
+            if len(boxes) >= len(self.boxes):
+                self.roi_scans += 1
+                self.boxes = boxes
+                return boxes
+
+        self.full_scans += 1
+        self.boxes = self.run(image)
+        return self.boxes
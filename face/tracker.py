@@ -0,0 +1,127 @@
+"""Tracking of the detected faces between detections.
+
+Full face detection is slow, so it runs only now and then. In between,
+each face box is moved with sparse optical flow (pyramidal Lucas-Kanade):
+corner points found inside the box are followed from the previous
+frame to the current one on a downscaled grayscale image, and the box
+is shifted by their median displacement and scaled by the median
+change of their spread (as in the Median Flow tracker).
+The tracker is re-seeded with the boxes of every full detection.
+"""
+import cv2
+import numpy as np
+
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+class FaceTracker:
+    """Follows face boxes from frame to frame.
+
+    Args:
+        scale: downscaling factor of the tracked images
+        max_points: maximum number of tracked points per face
+        min_points: a face with fewer tracked points keeps its box
+
+    Attributes:
+        boxes: current boxes, array of [left, top, right, bottom]
+    """
+    def __init__(self,
+                 scale: float = 0.5,
+                 max_points: int = 30,
+                 min_points: int = 4):
+
+        self.scale = scale
+        self.max_points = max_points
+        self.min_points = min_points
+        self.boxes = np.zeros((0, 4), dtype=int)
+        self.prev = None
+        self.points = []
+
+    def _gray(self, image: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGB2GRAY)
+        height, width = gray.shape
+        size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    def _find_points(self, box: np.ndarray) -> np.ndarray:
+        """Corner points inside the box (scaled coordinates), array (n, 1, 2)."""
+        height, width = self.prev.shape
+        left, top, right, bottom = np.rint(box * self.scale).astype(int)
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, width), min(bottom, height)
+        if right - left < 2 or bottom - top < 2:
+            return np.zeros((0, 1, 2), np.float32)
+        mask = np.zeros_like(self.prev)
+        mask[top:bottom, left:right] = 255
+        points = cv2.goodFeaturesToTrack(self.prev, self.max_points, 0.01, 3, mask=mask)
+        return points if points is not None else np.zeros((0, 1, 2), np.float32)
+
+    def seed(self, image: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        """Start tracking the boxes of a full detection.
+
+        Args:
+            image: RGB image (height, width, channel)
+            boxes: detections, array of [left, top, right, bottom]
+
+        Return:
+            np.ndarray: boxes
+        """
+        self.prev = self._gray(image)
+        self.boxes = np.asarray(boxes, dtype=int).reshape(-1, 4)
+        self.points = [self._find_points(b) for b in self.boxes]
+        return self.boxes
+
+    def update(self, image: np.ndarray) -> np.ndarray:
+        """Move the boxes to the new frame.
+
+        Args:
+            image: RGB image (height, width, channel)
+
+        Return:
+            np.ndarray: boxes, array of [left, top, right, bottom]
+        """
+        if self.prev is None or len(self.boxes) == 0:
+            return self.boxes
+
+        gray = self._gray(image)
+        counts = [len(p) for p in self.points]
+        if sum(counts) == 0:
+            self.prev = gray
+            self.points = [self._find_points(b) for b in self.boxes]
+            return self.boxes
+
+        # All faces in one call
+        points = np.concatenate(self.points)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self.prev, gray, points, None, **LK_PARAMS)
+        status = status.ravel().astype(bool)
+
+        boxes = self.boxes.astype(float)
+        start = 0
+        for k, n in enumerate(counts):
+            ok = status[start:start + n]
+            old = points[start:start + n][ok].reshape(-1, 2)
+            new = moved[start:start + n][ok].reshape(-1, 2)
+            start += n
+            if len(old) < self.min_points:
+                # Keep the box, look for new points
+                self.points[k] = np.zeros((0, 1, 2), np.float32)
+                continue
+
+            # Median shift and change of spread
+            shift = np.median(new - old, axis=0) / self.scale
+            spread_old = np.median(np.linalg.norm(old - np.median(old, axis=0), axis=1))
+            spread_new = np.median(np.linalg.norm(new - np.median(new, axis=0), axis=1))
+            zoom = spread_new / spread_old if spread_old > 0 else 1.
+
+            center = (boxes[k, :2] + boxes[k, 2:]) / 2 + shift
+            half = (boxes[k, 2:] - boxes[k, :2]) / 2 * zoom
+            boxes[k] = np.concatenate([center - half, center + half])
+            self.points[k] = new.reshape(-1, 1, 2).astype(np.float32)
+
+        self.boxes = np.rint(boxes).astype(int)
+        self.prev = gray
+        for k, p in enumerate(self.points):
+            if len(p) < self.min_points:
+                self.points[k] = self._find_points(self.boxes[k])
+        return self.boxes
@@ -0,0 +1,161 @@
+"""Headless simulation runner.
+
+Builds the same world as `main.py` from `config.CONFIG`, with a fixed
+random seed and without a display, camera or face detector,
+and steps it for a given number of frames.
+
+Usage:
+    python headless.py --frames 1000 --n-balls 500 --keys down
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import pygame
+import numpy as np
+
+from objects import World
+from utils import PressedKeys
+from config import CONFIG
+
+KEYS = {
+    'up': pygame.K_UP,
+    'down': pygame.K_DOWN,
+    'left': pygame.K_LEFT,
+    'right': pygame.K_RIGHT
+}
+
+
+def init_display(config: dict = CONFIG) -> pygame.Surface:
+    """Initialize pygame with a dummy display and return the screen."""
+    pygame.init()
+    return pygame.display.set_mode((config['screen_width'], config['screen_height']))
+
+
+def run(world: World,
+        n_frames: int,
+        pressed_keys=PressedKeys(),
+        screen: pygame.Surface = None,
+        trace_memory: bool = False) -> dict:
+    """Step the world for `n_frames` frames and measure the frame times.
+
+    Args:
+        world: world to simulate
+        n_frames: number of frames
+        pressed_keys: keys pressed in every frame
+        screen: if given, the world is also drawn on it in every frame
+        trace_memory: measure peak memory with `tracemalloc`
+            (slows down the run, so the timings are less accurate)
+
+    Return:
+        dict with steps/s, frame time percentiles in ms
+        and peak memory in MB (None if not traced)
+    """
+    frame_times = np.zeros(n_frames)
+    if trace_memory:
+        tracemalloc.start()
+
+    t_start = time.perf_counter()
+    for f in range(n_frames):
+        t0 = time.perf_counter()
+        world.step(pressed_keys)
+        if screen is not None:
+            world.draw(screen)
+        frame_times[f] = time.perf_counter() - t0
+    t_total = time.perf_counter() - t_start
+
+    peak_mb = None
+    if trace_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    return {
+        'frames': n_frames,
+        'steps_per_s': n_frames / t_total,
+        'p50_ms': float(np.percentile(frame_times, 50) * 1e3),
+        'p99_ms': float(np.percentile(frame_times, 99) * 1e3),
+        'max_ms': float(frame_times.max() * 1e3),
+        'peak_mb': peak_mb
+    }
+
+
+def simulate(n_frames: int,
+             n_balls: int = None,
+             radius: int = 10,
+             n_walls: int = 1,
+             seed: int = 0,
+             keys: tuple = (),
+             draw: bool = False,
+             memory_frames: int = 100,
+             workers: int = None,
+             config: dict = CONFIG) -> dict:
+    """Build a world and run it headless.
+
+    Timings are measured first; peak memory is measured in a separate,
+    shorter run of a freshly built world (same seed), because
+    `tracemalloc` distorts the timings.
+
+    Args:
+        n_frames: number of timed frames
+        n_balls: number of balls (default `config['n_balls']`)
+        radius: ball radius in pixels
+        n_walls: number of stationary walls
+        seed: random seed
+        keys: names of pressed keys ('up', 'down', 'left', 'right')
+        draw: also draw the world in every frame
+        memory_frames: number of frames of the memory run (0 to skip)
+        workers: number of physics worker processes
+            (default `config['physics_workers']`, 0 = single process)
+        config: configuration
+
+    Return:
+        dict with the parameters and the results of `run()`
+    """
+    if workers is not None:
+        config = dict(config, physics_workers=workers)
+    screen = init_display(config)
+    pressed_keys = PressedKeys(KEYS[k] for k in keys)
+    params = dict(n_balls=n_balls if n_balls is not None else config['n_balls'],
+                  radius=radius, n_walls=n_walls, seed=seed,
+                  keys=list(keys), draw=draw, workers=config['physics_workers'])
+
+    world = World.from_config(config, n_balls, radius, n_walls, seed)
+    stats = run(world, n_frames, pressed_keys, screen if draw else None)
+    world.close()
+
+    if memory_frames > 0:
+        world = World.from_config(config, n_balls, radius, n_walls, seed)
+        mem = run(world, memory_frames, pressed_keys, screen if draw else None,
+                  trace_memory=True)
+        stats['peak_mb'] = mem['peak_mb']
+        world.close()
+
+    return {**params, **stats}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--n-balls', type=int, default=CONFIG['n_balls'])
+    parser.add_argument('--radius', type=int, default=10)
+    parser.add_argument('--n-walls', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keys', nargs='*', default=[], choices=list(KEYS))
+    parser.add_argument('--draw', action='store_true',
+                        help='also draw the world (on a dummy display)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='physics worker processes (0 = single process)')
+    parser.add_argument('--memory-frames', type=int, default=100,
+                        help='frames of the separate peak memory run (0 to skip)')
+    args = parser.parse_args()
+
+    result = simulate(args.frames, args.n_balls, args.radius, args.n_walls,
+                      args.seed, args.keys, args.draw, args.memory_frames,
+                      args.workers)
+    print(json.dumps(result, indent=4))
+    pygame.quit()
@@ -1,3 +1,13 @@
+"""Face Balls game.
+
+Usage:
+    python main.py
+    python main.py --record recordings/demo --record-video
+    python main.py --replay recordings/demo --headless --fast --profile-output new.csv
+    python main.py --camera synthetic --size 1280 720 --headless --frames 1000 --profile-output synthetic.csv
+"""
+import os
+import argparse
 import logging
 logging.basicConfig(
     format='[%(processName)s][%(levelname)s]: %(message)s',
@@ -7,17 +17,70 @@ import pygame
 import numpy as np
 import cv2
 
-from process import SharedFrame
-from camera import Camera
-from face import FaceDetector
-from objects import Ball, Wall, MovingWall
-from utils import random_color, random_position
+from process import SharedFrameRing
+from camera import Camera, LocalCamera, SOURCES
+from face import FaceDetector, LocalFaceDetector
+from objects import World
+from utils import random_position, FrameProfiler, QualityGovernor
+from render import DirtyRectRenderer, FrameSurface
+from replay import SessionRecorder, SessionPlayer, ReplayCamera, ReplayFaceDetector
 from config import CONFIG
 
 
 if __name__ == "__main__":
-    # Frames per second
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--record', default=CONFIG['record'],
+                        help='record the session inputs to this directory')
+    parser.add_argument('--record-video', action='store_true', default=CONFIG['record_video'],
+                        help='also record the camera frames')
+    parser.add_argument('--replay', default=CONFIG['replay'],
+                        help='replay the session recorded in this directory')
+    parser.add_argument('--camera', choices=SOURCES, default=None,
+                        help='camera source (default CONFIG["camera_source"])')
+    parser.add_argument('--camera-file', default=None,
+                        help='video file used as the camera (implies --camera file)')
+    parser.add_argument('--pacing', choices=('realtime', 'fastest'), default=None,
+                        help='pacing of the file and synthetic camera sources')
+    parser.add_argument('--size', type=int, nargs=2, default=None, metavar=('WIDTH', 'HEIGHT'),
+                        help='screen and camera frame size')
+    parser.add_argument('--frames', type=int, default=0,
+                        help='stop after this many frames (0 = until quit)')
+    parser.add_argument('--headless', action='store_true',
+                        help='no window (dummy display)')
+    parser.add_argument('--fast', action='store_true',
+                        help='do not wait for the frame rate')
+    parser.add_argument('--profile-output', default=None,
+                        help='profile and write the frame times to a .csv or .jsonl file')
+    args = parser.parse_args()
+    if args.profile_output:
+        CONFIG['profile'] = True
+        CONFIG['profile_output'] = args.profile_output
+    if args.camera_file:
+        args.camera = 'file'
+        CONFIG['camera_options'] = dict(CONFIG['camera_options'], path=args.camera_file)
+    if args.camera:
+        CONFIG['camera_source'] = args.camera
+    if args.pacing:
+        CONFIG['camera_options'] = dict(CONFIG['camera_options'], pacing=args.pacing)
+    if args.size:
+        CONFIG['screen_width'], CONFIG['screen_height'] = args.size
+    if args.headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+    # Recorded session: same world, inputs from the recording
+    player = None
+    seed = CONFIG['seed']
+    if args.replay:
+        player = SessionPlayer(args.replay)
+        CONFIG.update(player.config)
+        seed = player.seed
+    elif args.record and seed is None:
+        seed = int(np.random.randint(2 ** 31))
+
+    # Frames per second (no waiting in fast replays)
     fps = CONFIG['fps']
+    tick_fps = 0 if args.fast else fps
 
     # Initialize pygame
     logging.debug("Initializing pygame")
@@ -34,120 +97,202 @@ if __name__ == "__main__":
 
     # Initialize camera
     shared_frame = None
-    if Camera.multiprocessing is True:
+    if player is not None:
+        logging.debug("Will replay the recorded camera frames")
+        cam = ReplayCamera(player, screen_dim)
+    elif CONFIG['camera_multiprocessing'] is True:
         logging.debug("Will use multiprocessing in camera recorder")
-        shared_frame = SharedFrame(screen_width,
-                                   screen_height,
-                                   CONFIG['n_channels'])
-        cam = Camera(screen_width, screen_height, shared_frame)
+        shared_frame = SharedFrameRing(screen_width,
+                                       screen_height,
+                                       CONFIG['n_channels'],
+                                       CONFIG['frame_slots'])
+        cam = Camera(screen_width, screen_height, shared_frame,
+                     CONFIG['camera_source'], CONFIG['camera_options'])
     else:
         logging.debug("Will use single-process camera recorder")
-        cam = Camera(screen_width, screen_height)
+        cam = LocalCamera(screen_width, screen_height,
+                          CONFIG['camera_source'], CONFIG['camera_options'])
 
     # Initialize face detector
-    if FaceDetector.multiprocessing is True:
+    backend_options = dict(CONFIG['face_backend_options'],
+                           upsample=CONFIG['detection_upsample'])
+    if player is not None:
+        logging.debug("Will replay the recorded face detections")
+        face_detector = ReplayFaceDetector(player)
+    elif CONFIG['detection_multiprocessing'] is True:
         logging.debug("Will use multiprocessing in face detector")
         assert shared_frame is not None, "Shared memory block was not allocated..."
-        face_detector = FaceDetector(shared_frame)
+        face_detector = FaceDetector(shared_frame,
+                                     rate=CONFIG['detection_rate'],
+                                     capacity=CONFIG['max_faces'],
+                                     backend=CONFIG['face_backend'],
+                                     backend_options=backend_options,
+                                     budget_ms=CONFIG['detection_budget_ms'],
+                                     scale=CONFIG['detection_scale'],
+                                     grayscale=CONFIG['detection_grayscale'],
+                                     tracking=CONFIG['face_tracking'],
+                                     roi_every=CONFIG['detection_roi_every'],
+                                     n_workers=CONFIG['detection_workers'])
     else:
         logging.debug("Will use single-process face detector")
-        face_detector = FaceDetector()
-
-    # Initialize moving wall
-    m_wall = MovingWall()
-
-    # Generate balls
-    n_balls = CONFIG['n_balls']
-    ball_group = pygame.sprite.Group()
-
-    for i in range(n_balls):
-        # radius = np.random.randint(20, 20, 1)[0]
-        radius = 10
-        b = Ball(
-            radius,
-            random_position(screen_dim, radius * 2),
-            (0, 0, 255),
-            screen_dim,
-            CONFIG['dissipation']
-        )
-        ball_group.add(b)
-
-    # Generate walls
-    wall0 = Wall(200, 200, 300, 300)  # TODO: Automatic creation and removal of these objects
-
-    wall_group = pygame.sprite.Group()
-    wall_group.add(wall0)
-    wall_group.add(m_wall)  # TODO: Automatic creation and removal of these objects
+        face_detector = LocalFaceDetector(backend=CONFIG['face_backend'],
+                                          backend_options=backend_options,
+                                          budget_ms=CONFIG['detection_budget_ms'],
+                                          scale=CONFIG['detection_scale'],
+                                          grayscale=CONFIG['detection_grayscale'],
+                                          tracking=CONFIG['face_tracking'])
+
+    # Surface showing the camera frames
+    frame_surface = FrameSurface(screen_dim, shared_frame)
+
+    # Generate balls and walls
+    world = World.from_config(CONFIG, seed=seed)
+
+    # Optional dirty-rectangle renderer
+    renderer = None
+    if CONFIG['dirty_rects'] is True:
+        logging.debug("Will use dirty-rectangle renderer")
+        renderer = DirtyRectRenderer(screen)
+
+    # Optional per-stage frame time profiler
+    profiler = FrameProfiler(CONFIG['profile'], CONFIG['profile_window'],
+                             CONFIG['profile_output'])
+    overlay = CONFIG['profile'] and CONFIG['profile_overlay']
+    telemetry = CONFIG['profile'] and cam.multiprocessing and face_detector.multiprocessing
+
+    # Optional quality governor holding the frame budget under load
+    governor = QualityGovernor(fps, face_detector, world.balls,
+                               enabled=CONFIG['quality_governor'] and player is None,
+                               window=CONFIG['governor_window'],
+                               cooldown=CONFIG['governor_cooldown'],
+                               max_awake=CONFIG['governor_max_awake'])
 
     # Game loop
     # Run until the user asks to quit
     running = True
+    n_frames = 0
+    cam_frame = None
+    recorder = None
+    if args.record:
+        recorder = SessionRecorder(args.record, seed, CONFIG, args.record_video)
 
     while running:
 
         # Ensure program maintains FPS
-        clock.tick(fps)
+        with profiler.scope('wait'):
+            clock.tick(tick_fps)
+        governor.update(clock.get_rawtime())
+        profiler.end_frame()
+
+        n_frames += 1
+        if args.frames and n_frames > args.frames:
+            break
+        if player is not None:
+            if not player.advance():
+                break
+            # Quality level of the recording
+            if player.frame['level'] != governor.level:
+                governor.set_level(player.frame['level'])
 
         # Look for exit events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                running = False
+        bursts = 0
+        with profiler.scope('events'):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                    bursts += 1
+            if player is not None:
+                bursts = player.frame['bursts']
+            for _ in range(bursts):
+                # Burst of new balls
+                world.spawn_burst(random_position(screen_dim, 20), 20)
 
-        # Capture frame from camera and convert to surface
-        cam_frame = cam.capture_frame()
-        cam_surf = pygame.surfarray.make_surface(cam_frame)
+        # Capture frame from camera and get its surface (no new allocation)
+        # (under load the previous frame is kept for a few frames)
+        captured = cam_frame is None or governor.update_background() or not cam.frame_is_current()
+        if player is not None:
+            captured = player.frame['captured']
+        if captured:
+            with profiler.scope('capture'):
+                cam_frame = cam.capture_frame()
+            with profiler.scope('surface'):
+                cam_surf = frame_surface.update(cam_frame)
 
         # Detect faces
-        dets = face_detector.detect(cam_frame)
-        logging.debug(f"Faces: {dets}")
-
-        # Draw camera frame on the screen (as the background)
-        screen.blit(cam_surf, (0, 0))
-
-        # Move face walls
-        for d in dets:
-            # Draw bounding box
-            logging.debug(f"Drawing bbox: {d}")
-            left, top, right, bottom = d[0], d[1], d[2], d[3]
-            width = right - left
-            height = bottom - top
-            color = CONFIG['colors']['green']
-            thickness = 5
-            pygame.draw.rect(screen, color, (left, top, width, height), thickness)
-
-            # Draw face wall
-            logging.debug(f"Changing face wall position to {dets[0][:2]}")
-            m_wall.update(left, top, right, bottom)
+        with profiler.scope('detect'):
+            dets = face_detector.detect(cam_frame)
+
+        # Move, create and retire face walls
+        with profiler.scope('walls'):
+            world.face_walls.update(dets)
 
         # Get pressed keys
-        pressed_keys = pygame.key.get_pressed()
+        if player is not None:
+            pressed_keys = player.pressed_keys()
+        else:
+            pressed_keys = pygame.key.get_pressed()
 
         # Update all balls
-        for index, b in enumerate(ball_group):
-            b.update(pressed_keys, ball_group, index, wall_group)
+        with profiler.scope('physics'):
+            world.step(pressed_keys)
+
+        if renderer is not None:
+            # Redraw and update only the changed regions of the screen
+            with profiler.scope('draw'):
+                renderer.draw(cam_surf, cam_frame, world, dets,
+                              CONFIG['colors']['green'])
+                if overlay:
+                    pygame.display.update(profiler.draw(screen))
+        else:
+            with profiler.scope('draw'):
+                # Draw camera frame on the screen (as the background)
+                screen.blit(cam_surf, (0, 0))
+
+                # Draw face bounding boxes
+                for d in dets:
+                    # Draw bounding box
+                    left, top, right, bottom = d[0], d[1], d[2], d[3]
+                    width = right - left
+                    height = bottom - top
+                    color = CONFIG['colors']['green']
+                    thickness = 5
+                    pygame.draw.rect(screen, color, (left, top, width, height), thickness)
+
+                # Draw balls and walls on the screen
+                world.draw(screen)
+
+                if overlay:
+                    profiler.draw(screen)
 
-        # Draw balls on the screen
-        for b in ball_group:
-            screen.blit(b.surf, b.rect)
+            # Flip the display
+            with profiler.scope('flip'):
+                pygame.display.flip()
 
-        # Draw walls on the screen
-        for w in wall_group:
-            screen.blit(w.surf, w.rect)
+        # Health of the camera and detector processes (frame shown now)
+        if telemetry:
+            profiler.record(**cam.sample_telemetry(), **face_detector.sample_telemetry())
+        if governor.enabled:
+            profiler.record(quality_level=governor.level)
 
-        # Draw moving walls on the screen
-        # TODO: Automatic creation and removal of these objects
-        screen.blit(m_wall.surf, m_wall.rect)
+        if recorder is not None:
+            recorder.frame(pressed_keys, bursts, dets, captured, governor.level, cam_frame)
 
-        # Flip the display
-        pygame.display.flip()
+    profiler.close()
+    if recorder is not None:
+        recorder.close(world)
+    if player is not None:
+        player.check(world)
 
     # Done! Time to quit
     logging.debug("Quiting pygame")
     pygame.quit()
 
     # Terminate processes and unlink shared memory
+    world.close()
+    del governor
     del cam
     del face_detector
     del shared_frame
@@ -1,3 +1,7 @@
 from .ball import Ball
+from .ball_system import BallSystem
 from .wall import Wall
 from .moving_wall import MovingWall
+from .world import World
+from .face_walls import FaceWallManager
+from .parallel import ParallelBallSystem
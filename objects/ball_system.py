@@ -0,0 +1,529 @@
+from typing import Tuple
+
+import pygame
+import numpy as np
+
+from .ball import Ball
+from .moving_wall import MovingWall
+from .collisions import ball_elastic_collision_batch, separate_overlaps, \
+    spatial_hash_pairs, circle_rect_contacts
+
+
+# Per-ball arrays: name -> (shape of a single element, dtype)
+ARRAYS = {
+    'pos': ((2,), int),
+    'pos_buff': ((2,), float),
+    'velocity': ((2,), float),
+    'awake': ((), bool),
+    'rest_frames': ((), int),
+    'radius': ((), int),
+    'mass': ((), float)
+}
+
+# Screen sides: name -> (axis, high side?)
+SIDES = {
+    'left': (0, False),
+    'right': (0, True),
+    'top': (1, False),
+    'bottom': (1, True)
+}
+
+
+def wall_rects(wall_group: pygame.sprite.Group) -> np.ndarray:
+    """Return rectangles [left, top, right, bottom] of all walls, shape (m, 4)."""
+    return np.array([[w.rect.left, w.rect.top, w.rect.right, w.rect.bottom]
+                     for w in wall_group], dtype=int).reshape(-1, 4)
+
+
+def moving_walls(wall_group: pygame.sprite.Group) -> np.ndarray:
+    """Return boolean mask of moving walls (in the order of `wall_rects`)."""
+    return np.array([isinstance(w, MovingWall) for w in wall_group], dtype=bool)
+
+
+class BallSystem:
+    """All balls stored as a structure of arrays.
+
+    Positions, sub-pixel buffers, velocities, radii and masses
+    are kept in contiguous NumPy arrays, so that integration,
+    bouncing off the screen boundaries and clamping are done
+    for all balls in a few array operations per frame.
+    `Ball` sprites are only views used for rendering.
+
+    Balls slower than `sleep_velocity` for `sleep_frames` frames
+    fall asleep: they stop and are skipped in the ball-ball
+    and ball-wall checks (other than as targets of awake balls).
+    They wake up when an awake ball moves them, when a key-press
+    acceleration is applied, or when a moving wall overlaps them.
+
+    The arrays are views of the first `n` rows of buffers preallocated
+    for `capacity` balls. Balls can be spawned and despawned at runtime
+    without allocations (except when the capacity is doubled):
+    a despawned ball is replaced by the last one, so that the live balls
+    are always packed at the front of the buffers. Despawned `Ball`
+    sprites are kept in a pool and reused by `spawn()`.
+
+    Under load the quality can be lowered: ball-ball collisions
+    can be resolved every `collision_every` frames only, and the number
+    of awake balls can be capped to `max_awake` (the slowest awake
+    balls are put to sleep, see `limit_awake()`).
+
+    Balls can leave the screen through openings in the screen edges
+    (see `add_opening()`). They are despawned when they are fully
+    outside the screen.
+
+    Args:
+        screen_dim: screen dimensions in pixels
+        dissipation: dissipation of energy at each bounce (default 0)
+        capacity: number of preallocated balls
+
+    Attributes:
+        pos: top-left corners of the bounding boxes, shape (n, 2), int
+        pos_buff: position buffers used to handle sub-pixel movements, shape (n, 2)
+        velocity: velocities [dx, dy], shape (n, 2)
+        radius: radii in pixels, shape (n,)
+        mass: masses, shape (n,)
+        awake: activity flags, shape (n,), bool
+        rest_frames: number of consecutive slow frames, shape (n,)
+        sprites: list of `Ball` views, sprites[i] is the ball i
+    """
+    def __init__(self,
+                 screen_dim: Tuple[int, int],
+                 dissipation: float = 0.,
+                 capacity: int = 64):
+
+        self.screen_width = screen_dim[0]
+        self.screen_height = screen_dim[1]
+        self.screen_dim = np.array(screen_dim)
+        self.dissipation = dissipation
+
+        # Acceleration due to key press
+        self.dv = 0.33
+
+        # Relaxation iterations of the overlap correction
+        self.collision_iterations = 1
+
+        # Quality under load: ball-ball collisions every n-th frame,
+        # maximum number of awake balls (None = no limit)
+        self.collision_every = 1
+        self.max_awake = None
+        self.frames = 0
+
+        # Sleeping
+        self.sleep_velocity = 0.05
+        self.sleep_frames = 60
+
+        # Openings in the screen edges: (side, start, end)
+        self.openings = []
+
+        self.n = 0
+        self.capacity = 0
+        self.buffers = {}
+        self.sprites = []
+        self.ball_pool = {}
+        self.reserve(capacity)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def reserve(self, capacity: int) -> None:
+        """Make sure the buffers can hold `capacity` balls."""
+        if capacity <= self.capacity:
+            return
+        for name, (shape, dtype) in ARRAYS.items():
+            buff = np.zeros((capacity,) + shape, dtype=dtype)
+            if name in self.buffers:
+                buff[:self.n] = self.buffers[name][:self.n]
+            self.buffers[name] = buff
+        self.capacity = capacity
+        self._bind()
+
+    def _bind(self) -> None:
+        """Point the array attributes at the live part of the buffers."""
+        for name in ARRAYS:
+            setattr(self, name, self.buffers[name][:self.n])
+
+    def add(self,
+            ball: Ball,
+            position: Tuple[int, int],
+            velocity: Tuple[float, float] = (0., 0.)) -> int:
+        """Add ball to the system.
+
+        The capacity is doubled if the buffers are full.
+
+        Args:
+            ball: ball sprite (becomes a view into this system)
+            position: initial position of the top-left corner
+                of the ball's bounding box
+            velocity: initial velocity
+
+        Return:
+            index of the ball
+        """
+        if self.n == self.capacity:
+            self.reserve(max(2 * self.capacity, 1))
+
+        k = self.n
+        b = self.buffers
+        b['pos'][k] = position
+        b['pos_buff'][k] = 0.
+        b['velocity'][k] = velocity
+        b['awake'][k] = True
+        b['rest_frames'][k] = 0
+        b['radius'][k] = ball.radius
+        b['mass'][k] = ball.mass
+        self.n += 1
+        self._bind()
+
+        ball.system = self
+        ball.index = k
+        self.sprites.append(ball)
+        return k
+
+    def spawn(self,
+              radius: int,
+              color: Tuple[int, int, int],
+              position: Tuple[int, int],
+              velocity: Tuple[float, float] = (0., 0.)) -> int:
+        """Add a ball, reusing a despawned sprite of the same radius and color.
+
+        Args:
+            radius: radius in pixels
+            color: fill color
+            position: initial position of the top-left corner
+                of the ball's bounding box
+            velocity: initial velocity
+
+        Return:
+            index of the ball
+        """
+        pool = self.ball_pool.get((radius, tuple(color)))
+        ball = pool.pop() if pool else Ball(radius, color)
+        return self.add(ball, position, velocity)
+
+    def prefill(self, radius: int, color: Tuple[int, int, int], count: int) -> None:
+        """Create `count` sprites in the pool and reserve capacity for them."""
+        pool = self.ball_pool.setdefault((radius, tuple(color)), [])
+        pool.extend(Ball(radius, color) for _ in range(count))
+        self.reserve(self.n + count)
+
+    def despawn(self, index: int) -> Ball:
+        """Remove ball `index`, the last ball takes its place.
+
+        Return:
+            removed sprite (it is also put back to the pool)
+        """
+        last = self.n - 1
+        ball = self.sprites[index]
+        if index != last:
+            for buff in self.buffers.values():
+                buff[index] = buff[last]
+            moved = self.sprites[last]
+            moved.index = index
+            self.sprites[index] = moved
+        self.sprites.pop()
+        self.n -= 1
+        self._bind()
+
+        ball.system = None
+        ball.index = None
+        self.ball_pool.setdefault((ball.radius, ball.color), []).append(ball)
+        return ball
+
+    def despawn_many(self, indices: np.ndarray) -> None:
+        """Remove several balls (indices are those before the removal)."""
+        for k in np.sort(indices)[::-1].tolist():
+            self.despawn(k)
+
+    def add_opening(self, side: str, start: int, end: int) -> None:
+        """Add an opening in a screen edge, through which balls can leave.
+
+        Args:
+            side: 'left', 'right', 'top' or 'bottom'
+            start: start of the opening along the edge in pixels
+            end: end of the opening along the edge in pixels
+
+        Return:
+            None
+        """
+        assert side in SIDES, f"Unknown side: {side}"
+        self.openings.append((side, start, end))
+
+    def _openings_mask(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return masks (n, 2) of balls facing openings on the low and high sides."""
+        low = np.zeros((len(self), 2), dtype=bool)
+        high = np.zeros((len(self), 2), dtype=bool)
+        centers = self.centers
+        for side, start, end in self.openings:
+            axis, is_high = SIDES[side]
+            along = centers[:, 1 - axis]
+            # The whole ball must fit through the opening
+            fits = (along - self.radius >= start) & (along + self.radius <= end)
+            (high if is_high else low)[:, axis] |= fits
+        return low, high
+
+    def despawn_outside(self) -> int:
+        """Despawn balls which are fully outside the screen.
+
+        Return:
+            number of despawned balls
+        """
+        if len(self.openings) == 0:
+            return 0
+        size = 2 * self.radius[:, np.newaxis]
+        outside = ((self.pos + size <= 0) | (self.pos >= self.screen_dim)).any(axis=1)
+        indices = np.flatnonzero(outside)
+        self.despawn_many(indices)
+        return len(indices)
+
+    @property
+    def centers(self) -> np.ndarray:
+        """Centers of all balls, shape (n, 2)."""
+        return self.pos + self.radius[:, np.newaxis]
+
+    def update(self,
+               pressed_keys: tuple,
+               wall_group: pygame.sprite.Group) -> None:
+        """Step all balls by one frame.
+
+        Args:
+            pressed_keys: tuple returned by pygame.key.get_pressed()
+            wall_group: reference to sprite.Group containing the walls
+
+        Return:
+            None
+        """
+        rects = wall_rects(wall_group)
+
+        self.accelerate(self.key_acceleration(pressed_keys))
+        self.integrate()
+        self.bounce_screen()
+        if self.frames % self.collision_every == 0:
+            self.collide_balls()
+        self.wake_overlapping(rects[moving_walls(wall_group)])
+        self.collide_walls(rects)
+        self.clamp_screen()
+        self.update_sleep()
+        if self.max_awake is not None:
+            self.limit_awake(self.max_awake)
+        self.despawn_outside()
+        self.frames += 1
+
+    @property
+    def n_awake(self) -> int:
+        """Number of awake balls."""
+        return int(self.awake.sum())
+
+    def wake(self, mask: np.ndarray) -> None:
+        """Wake up the balls selected by the boolean mask (or index array)."""
+        self.awake[mask] = True
+        self.rest_frames[mask] = 0
+
+    def update_sleep(self) -> None:
+        """Count slow frames and put balls which rest long enough to sleep."""
+        slow = (self.velocity ** 2).sum(axis=1) < self.sleep_velocity ** 2
+        self.rest_frames[:] = np.where(slow & self.awake, self.rest_frames + 1, 0)
+        asleep = self.rest_frames >= self.sleep_frames
+        self.awake[asleep] = False
+        self.velocity[asleep] = 0
+        self.rest_frames[asleep] = 0
+
+    def limit_awake(self, max_awake: int) -> None:
+        """Put the slowest awake balls to sleep, so that at most `max_awake` stay awake."""
+        awake = np.flatnonzero(self.awake)
+        excess = len(awake) - max_awake
+        if excess <= 0:
+            return
+        speed2 = (self.velocity[awake] ** 2).sum(axis=1)
+        slowest = awake[np.argpartition(speed2, excess - 1)[:excess]]
+        self.awake[slowest] = False
+        self.velocity[slowest] = 0
+        self.rest_frames[slowest] = 0
+
+    def wake_overlapping(self, rects: np.ndarray) -> None:
+        """Wake up sleeping balls overlapping rectangles (e.g. moving walls)."""
+        sleeping = np.flatnonzero(~self.awake)
+        if len(sleeping) == 0 or len(rects) == 0:
+            return
+        ball, _, _, _ = circle_rect_contacts(
+            self.centers[sleeping], self.radius[sleeping], rects)
+        self.wake(sleeping[ball])
+
+    def key_acceleration(self, pressed_keys: tuple) -> Tuple[float, float]:
+        """Return acceleration (ax, ay) due to key press."""
+        ax = self.dv * (pressed_keys[pygame.K_RIGHT] - pressed_keys[pygame.K_LEFT])
+        ay = self.dv * (pressed_keys[pygame.K_DOWN] - pressed_keys[pygame.K_UP])
+        return ax, ay
+
+    def accelerate(self, acc: Tuple[float, float]) -> None:
+        """Update velocities by acceleration (ax, ay), wakes up all balls."""
+        if acc[0] != 0 or acc[1] != 0:
+            self.wake(slice(None))
+            self.velocity += acc
+
+    def integrate(self) -> None:
+        """Move balls by their velocities, in whole pixels only."""
+        self.pos_buff += self.velocity
+        # Truncation towards zero, like int()
+        dxy = self.pos_buff.astype(int)
+        self.pos += dxy
+        self.pos_buff -= dxy
+
+    def bounce_screen(self) -> None:
+        """Bounce off the screen boundaries (except at the openings)."""
+        size = 2 * self.radius[:, np.newaxis]
+        low = self.pos + self.velocity < 0
+        high = ~low & (self.pos + size + self.velocity > self.screen_dim)
+        if len(self.openings) > 0:
+            open_low, open_high = self._openings_mask()
+            low &= ~open_low
+            high &= ~open_high
+        self.velocity[low | high] *= -1 * (1 - self.dissipation)
+
+    def clamp_screen(self) -> None:
+        """Keep balls on the screen (except at the openings)."""
+        size = 2 * self.radius[:, np.newaxis]
+        if len(self.openings) == 0:
+            np.clip(self.pos, 0, self.screen_dim - size, out=self.pos)
+            return
+        open_low, open_high = self._openings_mask()
+        lower = np.where(open_low, np.iinfo(self.pos.dtype).min, 0)
+        upper = np.where(open_high, np.iinfo(self.pos.dtype).max, self.screen_dim - size)
+        np.clip(self.pos, lower, upper, out=self.pos)
+
+    def candidate_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Find pairs of balls which may collide (broad phase).
+
+        Only pairs with at least one awake ball are returned.
+
+        Return:
+            index arrays (i, j) with i < j
+        """
+        if len(self) < 2:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        cell_size = 2 * self.radius.max()
+        if self.awake.all():
+            return spatial_hash_pairs(self.centers, cell_size)
+        return spatial_hash_pairs(self.centers, cell_size, self.awake)
+
+    def colliding_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Find pairs of colliding balls (broad and narrow phase).
+
+        The pairs are sorted by (i, j), so that the result of
+        the batched collision response does not depend on the
+        order in which the broad phase emits the pairs.
+
+        Return:
+            index arrays (i, j) with i < j
+        """
+        i, j = self.candidate_pairs()
+
+        # Confirm circle-like collisions
+        centers = self.centers
+        dist2 = ((centers[i] - centers[j]) ** 2).sum(axis=1)
+        colliding = dist2 <= (self.radius[i] + self.radius[j]) ** 2
+        i, j = i[colliding], j[colliding]
+
+        order = np.lexsort((j, i))
+        return i[order], j[order]
+
+    def collide_balls(self) -> None:
+        """Bounce balls off each other.
+
+        All colliding pairs are resolved in one vectorized pass,
+        see `ball_elastic_collision_batch` and `separate_overlaps`.
+        """
+        i, j = self.colliding_pairs()
+
+        # Conservation of momentum
+        self.velocity[:] = ball_elastic_collision_batch(
+            self.velocity, self.mass, self.centers, i, j, self.dissipation)
+
+        # Position correction (if overlap exists)
+        pos_before = self.pos.copy()
+        separate_overlaps(self.pos, self.radius, i, j, self.collision_iterations)
+
+        self.wake_touched(pos_before)
+
+    def wake_touched(self, pos_before: np.ndarray) -> None:
+        """Wake up sleeping balls which were hit by awake balls.
+
+        A sleeping ball wakes up if it was moved by the overlap
+        correction or got a velocity above `sleep_velocity`.
+        Otherwise it stays at rest.
+
+        Args:
+            pos_before: positions before the overlap correction
+        """
+        sleeping = ~self.awake
+        moved = (self.pos != pos_before).any(axis=1)
+        fast = (self.velocity ** 2).sum(axis=1) >= self.sleep_velocity ** 2
+        woken = sleeping & (moved | fast)
+        self.wake(woken)
+        self.velocity[sleeping & ~woken] = 0
+
+    def collide_walls(self, rects: np.ndarray) -> None:
+        """Bounce awake balls off all walls they overlap.
+
+        The walls are treated as axis-aligned rectangles,
+        see `circle_rect_contacts`. The velocity component along
+        the contact normal is reversed (if the ball approaches the wall)
+        and reduced by the dissipation. The ball is pushed out of the wall.
+
+        Args:
+            rects: wall rectangles [left, top, right, bottom], shape (m, 4)
+        """
+        awake = np.flatnonzero(self.awake)
+        if len(rects) == 0 or len(awake) == 0:
+            return
+
+        ball, wall, normal, depth = circle_rect_contacts(
+            self.centers[awake], self.radius[awake], rects)
+        ball = awake[ball]
+        if len(ball) == 0:
+            return
+
+        # Walls are resolved one after another, so that a ball touching
+        # two walls is not reflected twice in the same direction
+        for w in np.unique(wall):
+            k = wall == w
+            b, n = ball[k], normal[k]
+
+            # Velocity correction
+            v_n = np.minimum((self.velocity[b] * n).sum(axis=1), 0)
+            self.velocity[b] -= (2 - self.dissipation) * v_n[:, np.newaxis] * n
+
+            # Position correction (with 1 px clearance)
+            shift = np.rint(n * (depth[k] + 1)[:, np.newaxis])
+            self.pos[b] += shift.astype(self.pos.dtype)
+
+    def take(self, idx: np.ndarray) -> 'BallSystem':
+        """Return a copy of the balls `idx` as a new system (without sprites)."""
+        sub = BallSystem((self.screen_width, self.screen_height),
+                         self.dissipation, capacity=0)
+        sub.openings = self.openings
+        sub.dv = self.dv
+        sub.collision_iterations = self.collision_iterations
+        sub.sleep_velocity = self.sleep_velocity
+        sub.sleep_frames = self.sleep_frames
+        sub.pos = self.pos[idx]
+        sub.pos_buff = self.pos_buff[idx]
+        sub.velocity = self.velocity[idx]
+        sub.awake = self.awake[idx]
+        sub.rest_frames = self.rest_frames[idx]
+        sub.radius = self.radius[idx]
+        sub.mass = self.mass[idx]
+        return sub
+
+    def put(self, idx: np.ndarray, sub: 'BallSystem', local=slice(None)) -> None:
+        """Write the state of balls `local` of `sub` back to balls `idx`."""
+        self.pos[idx] = sub.pos[local]
+        self.pos_buff[idx] = sub.pos_buff[local]
+        self.velocity[idx] = sub.velocity[local]
+        self.awake[idx] = sub.awake[local]
+        self.rest_frames[idx] = sub.rest_frames[local]
+
+    def draw(self, surface: pygame.Surface) -> None:
+        """Draw all balls on the surface."""
+        surface.blits(
+            [(b.surf, p) for b, p in zip(self.sprites, self.pos.tolist())],
+            doreturn=False)
@@ -74,3 +74,256 @@ def ball_elastic_collision(
     v2 *= 1. - dissipation / 2.
 
     return (v1, v2)
+
+
+def spatial_hash_pairs(
+        centers: np.array,
+        cell_size: float,
+        active: np.array = None
+    ) -> Tuple[np.array, np.array]:
+    """Broad phase collision search on a uniform grid.
+
+    Centers are binned into square cells of size `cell_size`
+    (should be at least the maximum ball diameter). Candidate pairs
+    are emitted only for balls in the same or neighbouring cells.
+    Each pair is emitted once, always with i < j.
+
+    If `active` is given, only pairs with at least one active ball
+    are emitted and the work is proportional to the number
+    of active balls (plus sorting of all cell keys).
+
+    Args:
+        centers: ball centers, shape (n, 2)
+        cell_size: grid cell size in pixels
+        active: optional boolean mask of active balls, shape (n,)
+
+    Return:
+        index arrays of candidate pairs (i, j)
+    """
+    n = len(centers)
+    if n < 2:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    cells = np.floor_divide(centers, cell_size).astype(np.int64)
+    cells -= cells.min(axis=0)
+
+    # Cell keys padded by one cell on each side,
+    # so that neighbour keys never alias
+    stride = cells[:, 1].max() + 3
+    keys = (cells[:, 0] + 1) * stride + (cells[:, 1] + 1)
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    if active is None:
+        queries = np.arange(n)
+        qkeys = sorted_keys
+
+        # Same cell: pair each ball with the balls after it in sorted order
+        end = np.searchsorted(sorted_keys, qkeys, side='right')
+        starts = [queries + 1]
+        counts = [end - queries - 1]
+
+        # Half of the neighbouring cells, so that each pair of cells is visited once
+        neighbours = ((1, -1), (1, 0), (1, 1), (0, 1))
+    else:
+        queries = np.flatnonzero(active[order])
+        qkeys = sorted_keys[queries]
+        starts = []
+        counts = []
+
+        # All neighbouring cells (and the same cell),
+        # duplicates are removed below
+        neighbours = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+    for dx, dy in neighbours:
+        nkeys = qkeys + dx * stride + dy
+        lo = np.searchsorted(sorted_keys, nkeys, side='left')
+        hi = np.searchsorted(sorted_keys, nkeys, side='right')
+        starts.append(lo)
+        counts.append(hi - lo)
+
+    starts = np.concatenate(starts)
+    counts = np.concatenate(counts)
+    queries = np.tile(queries, len(counts) // max(len(queries), 1))
+
+    # Expand ranges [start, start + count) into individual pairs
+    total = counts.sum()
+    first = np.repeat(queries, counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = np.repeat(starts, counts) + offsets
+
+    i = order[first]
+    j = order[second]
+
+    if active is not None:
+        # Drop self-pairs, and pairs of two active balls found from both sides
+        keep = (i != j) & (~active[j] | (i < j))
+        i, j = i[keep], j[keep]
+
+    swap = i > j
+    i[swap], j[swap] = j[swap], i[swap]
+
+    return i, j
+
+
+def ball_elastic_collision_batch(
+        velocity: np.array,
+        mass: np.array,
+        centers: np.array,
+        i: np.array,
+        j: np.array,
+        dissipation: float = 0.
+    ) -> np.array:
+    """2D elastic collisions of many pairs of balls at once.
+
+    Batched version of `ball_elastic_collision`. All impulses are computed
+    from the pre-collision velocities. If a ball takes part in several
+    pairs in the same frame, summing its impulses would overshoot and
+    inject energy into clusters, so the impulse of each pair is scaled
+    by `1 / max(k_i, k_j)`, where `k` is the number of pairs of a ball.
+    Both balls of a pair get the same scaled impulse, so the momentum
+    is conserved and the kinetic energy does not grow.
+    The dissipation factor is applied once per pair,
+    i.e. `(1 - dissipation / 2) ** k` for a ball in `k` pairs.
+    For disjoint pairs the result equals the scalar function.
+
+    Args:
+        velocity: velocities of all balls, shape (n, 2)
+        mass: masses of all balls, shape (n,)
+        centers: center positions of all balls, shape (n, 2)
+        i: indices of the first balls of the colliding pairs
+        j: indices of the second balls of the colliding pairs
+        dissipation: dissipation of energy at each collision (default 0)
+
+    Return:
+        resulting velocities, shape (n, 2)
+    """
+    if len(i) == 0:
+        return velocity.copy()
+
+    dc = (centers[i] - centers[j]).astype(float)
+    du = velocity[i] - velocity[j]
+    d = (dc ** 2).sum(axis=1)
+    # For numerical stability, do not allow too little distance
+    d = np.maximum(d, 1e-3)
+    s = 2 * (du * dc).sum(axis=1) / d / (mass[i] + mass[j])
+
+    n = len(velocity)
+    counts = np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+    s = (s / np.maximum(counts[i], counts[j]))[:, np.newaxis]
+
+    dv = np.zeros_like(velocity)
+    np.add.at(dv, i, -mass[j][:, np.newaxis] * s * dc)
+    np.add.at(dv, j, mass[i][:, np.newaxis] * s * dc)
+    factor = (1. - dissipation / 2.) ** counts
+
+    return (velocity + dv) * factor[:, np.newaxis]
+
+
+def separate_overlaps(
+        pos: np.array,
+        radius: np.array,
+        i: np.array,
+        j: np.array,
+        iterations: int = 1
+    ) -> None:
+    """Push overlapping pairs of balls apart, in whole pixels.
+
+    Each ball of an overlapping pair is moved by the overlap (+0.5 px)
+    along the line connecting the centers, truncated to whole pixels.
+    Displacements of balls taking part in several pairs are summed.
+    The procedure is repeated `iterations` times (relaxation),
+    each time with distances recomputed from the updated positions.
+
+    Args:
+        pos: integer positions of all balls, shape (n, 2), modified in place
+        radius: radii of all balls, shape (n,)
+        i: indices of the first balls of the pairs
+        j: indices of the second balls of the pairs
+        iterations: number of relaxation iterations (default 1)
+
+    Return:
+        None
+    """
+    if len(i) == 0:
+        return
+
+    for _ in range(iterations):
+        dc = (pos[i] - pos[j] + (radius[i] - radius[j])[:, np.newaxis]).astype(float)
+        distance = np.maximum(np.sqrt((dc ** 2).sum(axis=1)), 1e-3)
+        overlap = radius[i] + radius[j] - distance
+        active = overlap >= 0
+        if not active.any():
+            break
+
+        shift = np.trunc(
+            ((overlap + 0.5) / distance)[:, np.newaxis] * dc
+        ).astype(pos.dtype)
+        shift[~active] = 0
+
+        delta = np.zeros_like(pos)
+        np.add.at(delta, i, shift)
+        np.add.at(delta, j, -shift)
+        pos += delta
+
+
+def circle_rect_contacts(
+        centers: np.array,
+        radius: np.array,
+        rects: np.array
+    ) -> Tuple[np.array, np.array, np.array, np.array]:
+    """Analytic collision test of circles with axis-aligned rectangles.
+
+    For each circle and rectangle the point of the rectangle closest
+    to the circle center is found. The circle overlaps the rectangle
+    if this point is closer than the radius. If the center is inside
+    the rectangle, the contact is with the nearest side.
+
+    Args:
+        centers: circle centers, shape (n, 2)
+        radius: circle radii, shape (n,)
+        rects: rectangles [left, top, right, bottom], shape (m, 4)
+
+    Return:
+        tuple (ball, wall, normal, depth) of all contacts:
+        circle indices, rectangle indices, unit contact normals
+        pointing from the rectangle to the circle, shape (k, 2),
+        and penetration depths, shape (k,)
+    """
+    if len(centers) == 0 or len(rects) == 0:
+        return (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                np.zeros((0, 2)), np.zeros(0))
+
+    c = centers[:, np.newaxis, :].astype(float)  # (n, 1, 2)
+    lo = rects[np.newaxis, :, :2]                # (1, m, 2)
+    hi = rects[np.newaxis, :, 2:]                # (1, m, 2)
+
+    closest = np.clip(c, lo, hi)
+    d = c - closest
+    dist2 = (d ** 2).sum(axis=2)                 # (n, m)
+    r = radius[:, np.newaxis]
+    ball, wall = np.nonzero(dist2 < r ** 2)
+
+    d = d[ball, wall]
+    dist = np.sqrt(dist2[ball, wall])
+    outside = dist > 0
+
+    normal = np.zeros((len(ball), 2))
+    normal[outside] = d[outside] / dist[outside, np.newaxis]
+    depth = radius[ball] - dist
+
+    # Center inside the rectangle -> push out through the nearest side
+    inside = np.flatnonzero(~outside)
+    if len(inside) > 0:
+        ci = c[ball[inside], 0]
+        ri = rects[wall[inside]]
+        # Distances to the left, top, right and bottom sides
+        pen = np.stack([ci[:, 0] - ri[:, 0], ci[:, 1] - ri[:, 1],
+                        ri[:, 2] - ci[:, 0], ri[:, 3] - ci[:, 1]], axis=1)
+        side = pen.argmin(axis=1)
+        sides = np.array([[-1., 0.], [0., -1.], [1., 0.], [0., 1.]])
+        normal[inside] = sides[side]
+        depth[inside] = radius[ball[inside]] + pen[np.arange(len(inside)), side]
+
+    return ball, wall, normal, depth
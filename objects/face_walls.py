@@ -0,0 +1,110 @@
+import logging
+
+import pygame
+import numpy as np
+
+from .moving_wall import MovingWall
+
+
+class FaceWallManager:
+    """Moving walls following the detected faces, one wall per face.
+
+    Walls are taken from a preallocated pool when a new face appears
+    and returned to the pool when the face has not been detected
+    in `max_missed` consecutive updates. Detections are matched
+    to the walls by the distance between box centers. New faces
+    beyond `max_faces` get no wall (logged once).
+
+    Args:
+        wall_group: sprite.Group to which the active walls are added
+        max_faces: pool size, i.e. maximum number of tracked faces
+        max_missed: number of updates without a matching detection
+            after which the wall is retired
+        max_distance: maximum distance in pixels between the centers
+            of a wall and a detection to consider them the same face
+
+    Attributes:
+        active: walls currently following faces
+    """
+    def __init__(self,
+                 wall_group: pygame.sprite.Group,
+                 max_faces: int = 8,
+                 max_missed: int = 5,
+                 max_distance: float = 150.):
+
+        self.wall_group = wall_group
+        self.max_missed = max_missed
+        self.max_distance = max_distance
+
+        self.pool = [MovingWall() for _ in range(max_faces)]
+        self.active = []
+        self.missed = {}
+        self.pool_exhausted = False
+
+    def update(self, dets: np.ndarray) -> None:
+        """Move, create and retire walls according to the detections.
+
+        Args:
+            dets: detections, array of [left, top, right, bottom]
+
+        Return:
+            None
+        """
+        dets = np.asarray(dets).reshape(-1, 4)
+        matched = self._match(dets)
+        updated = set()
+
+        for k, det in enumerate(dets):
+            wall = matched.get(k)
+            if wall is None:
+                # New face
+                if len(self.pool) == 0:
+                    if not self.pool_exhausted:
+                        logging.warning(f"More than {len(self.active)} faces, "
+                                        f"the other ones get no wall")
+                        self.pool_exhausted = True
+                    continue
+                wall = self.pool.pop()
+                self.active.append(wall)
+                self.wall_group.add(wall)
+            self.missed[wall] = 0
+            wall.update(*det)
+            updated.add(wall)
+
+        for wall in list(self.active):
+            if wall not in updated:
+                self.missed[wall] += 1
+                if self.missed[wall] > self.max_missed:
+                    self._retire(wall)
+
+    def _match(self, dets: np.ndarray) -> dict:
+        """Greedy matching of detections to active walls.
+
+        Return:
+            dict {detection index: wall}
+        """
+        matched = {}
+        if len(dets) == 0 or len(self.active) == 0:
+            return matched
+
+        det_centers = (dets[:, :2] + dets[:, 2:]) / 2
+        wall_centers = np.array([w.rect.center for w in self.active])
+        dist = np.sqrt(((det_centers[:, np.newaxis] - wall_centers) ** 2).sum(axis=2))
+
+        for flat in np.argsort(dist, axis=None):
+            k, w = (int(x) for x in np.unravel_index(flat, dist.shape))
+            if dist[k, w] > self.max_distance:
+                break
+            wall = self.active[w]
+            if k in matched or wall in matched.values():
+                continue
+            matched[k] = wall
+
+        return matched
+
+    def _retire(self, wall: MovingWall) -> None:
+        """Return the wall to the pool."""
+        self.active.remove(wall)
+        self.wall_group.remove(wall)
+        del self.missed[wall]
+        self.pool.append(wall)
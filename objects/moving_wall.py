@@ -7,29 +7,40 @@ from .wall import Wall
 
 
 class MovingWall(Wall):
+    """Wall following a bounding box (e.g. a detected face).
 
+    The surface and mask are reused as long as the size of the box
+    changes by no more than `tolerance` (relative) of the current size.
+
+    Args:
+        top, left, bottom, right: initial box, as in `Wall`
+        tolerance: relative size change tolerated without
+            reallocating the surface (default 0.1)
+    """
     def __init__(self,
                  top: int = 0,
                  left: int = 0,
                  bottom: int = 1,
-                 right: int = 1):
+                 right: int = 1,
+                 tolerance: float = 0.1):
         super().__init__(top, left, bottom, right)
+        self.tolerance = tolerance
 
     def update(self, left, top, right, bottom):
-        # Change size -> new surface
         width = right - left
         height = bottom - top
-        self.surf = pygame.Surface((width, height)).convert_alpha()
-        self.surf.fill((0, 255, 0, 90))
+        surf_width, surf_height = self.surf.get_size()
 
-        # Mask used for collision detection
-        self.mask = pygame.mask.from_surface(self.surf, 50)
+        if abs(width - surf_width) > self.tolerance * surf_width \
+                or abs(height - surf_height) > self.tolerance * surf_height:
+            # Change size -> new surface
+            self.surf = pygame.Surface((width, height)).convert_alpha()
+            self.surf.fill((0, 255, 0, 90))
 
-        # Rectangle and initial position
-        self.rect = self.surf.get_rect()
+            # Mask used for collision detection
+            self.mask = pygame.mask.from_surface(self.surf, 50)
 
-        # New rectangle to fit in
-        new_rect = pygame.Rect(left, top, width, height)
+            self.rect.size = (width, height)
 
-        # Fit
-        self.rect = self.rect.fit(new_rect)
+        # Move in place, centered on the new box
+        self.rect.center = ((left + right) // 2, (top + bottom) // 2)
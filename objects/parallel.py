@@ -0,0 +1,284 @@
+"""Multi-process physics backend for very large numbers of balls.
+
+The screen is split into vertical strips, one per worker process.
+The ball state is kept in shared memory (`process.SharedArray`).
+In each phase of the frame a worker owns the balls whose centers lie
+in its strip (at the beginning of the phase) and writes only their
+state. Ball-ball collisions need the balls near the strip boundaries
+too, so each worker also reads a ghost zone on both sides. It is two
+of the largest ball diameters wide: the impulse of a pair depends on
+the number of pairs of both balls (see `ball_elastic_collision_batch`),
+so the partners of the balls near the boundary are read as well.
+The phases are separated by barriers. Reading and writing in the
+collision phase are separated by a barrier as well.
+
+The results are identical to the single-process `BallSystem`, because
+all stages are either per-ball operations or sums over the colliding
+pairs of a ball taken in the same (sorted) order.
+"""
+import os
+import logging
+import multiprocessing as mp
+
+import pygame
+import numpy as np
+
+from process import SharedArray
+from .ball_system import BallSystem, wall_rects, moving_walls
+from .collisions import ball_elastic_collision_batch, separate_overlaps
+
+# Layout of the control block
+AX, AY, N_WALLS, STOP, COLLIDE = range(5)
+
+# Ball arrays kept in shared memory
+STATE = ('pos', 'pos_buff', 'velocity', 'awake', 'rest_frames', 'radius', 'mass')
+
+
+def strip_index(centers: np.ndarray, screen_width: int, n_strips: int) -> np.ndarray:
+    """Return the index of the strip containing each center."""
+    strip = centers[:, 0] * n_strips // screen_width
+    return np.clip(strip, 0, n_strips - 1)
+
+
+class PhysicsWorker(mp.Process):
+    """Process stepping the balls of one strip of the screen.
+
+    Args:
+        rank: strip index
+        n_workers: number of workers (strips)
+        shared: dict of `SharedArray` with the ball state and control block
+        settings: dict with the `BallSystem` settings
+        start_barrier: barrier shared with the main process (frame start)
+        done_barrier: barrier shared with the main process (frame end)
+        sync_barrier: barrier shared by the workers only (phases)
+    """
+    def __init__(self, rank, n_workers, shared, settings,
+                 start_barrier, done_barrier, sync_barrier):
+        super().__init__()
+        self.rank = rank
+        self.n_workers = n_workers
+        self.shared = shared
+        self.settings = settings
+        self.start_barrier = start_barrier
+        self.done_barrier = done_barrier
+        self.sync_barrier = sync_barrier
+
+    def run(self):
+        logging.debug(f"{self.name} started, strip {self.rank}/{self.n_workers}")
+        state = ParallelBallSystem.attach(self.shared, self.settings)
+        control = self.shared['control'].array
+        walls = self.shared['walls'].array
+        moving = self.shared['moving'].array
+        width = state.screen_width
+
+        while True:
+            self.start_barrier.wait()
+            if control[STOP]:
+                break
+
+            # Integration and screen boundaries (per ball)
+            own = np.flatnonzero(strip_index(state.centers, width, self.n_workers) == self.rank)
+            sub = state.take(own)
+            sub.accelerate((control[AX], control[AY]))
+            sub.integrate()
+            sub.bounce_screen()
+            self.sync_barrier.wait()
+            state.put(own, sub)
+            self.sync_barrier.wait()
+
+            # Ball-ball collisions (owned balls + ghost zone),
+            # skipped in some frames under load
+            collide = bool(control[COLLIDE])
+            if collide:
+                own, own_local, pos_before = self.collide(state)
+
+            # Walls, clamping and sleeping (per ball)
+            rects = walls[:int(control[N_WALLS])]
+            sub = state.take(own)
+            if state.collision_iterations > 1 and collide:
+                sub.wake_touched(pos_before[own_local])
+            sub.wake_overlapping(rects[moving[:len(rects)]])
+            sub.collide_walls(rects)
+            sub.clamp_screen()
+            sub.update_sleep()
+            state.put(own, sub)
+
+            self.done_barrier.wait()
+
+        logging.debug(f"{self.name} stopped")
+
+    def collide(self, state):
+        """Resolve the ball-ball collisions of the owned balls.
+
+        Return:
+            tuple: owned balls (by their strip at the start of the phase),
+            their indices among the balls read and the positions read
+        """
+        width = state.screen_width
+        centers = state.centers
+        strip = strip_index(centers, width, self.n_workers)
+        margin = 4 * state.radius.max() if len(state) > 0 else 0
+        x0 = self.rank * width / self.n_workers
+        x1 = (self.rank + 1) * width / self.n_workers
+        near = np.flatnonzero((centers[:, 0] >= x0 - margin)
+                              & (centers[:, 0] < x1 + margin))
+        own_local = np.flatnonzero(strip[near] == self.rank)
+        own = near[own_local]
+
+        sub = state.take(near)
+        pos_before = sub.pos.copy()
+        i, j = sub.colliding_pairs()
+        sub.velocity = ball_elastic_collision_batch(
+            sub.velocity, sub.mass, sub.centers, i, j, sub.dissipation)
+        separate_overlaps(sub.pos, sub.radius, i, j, 1)
+        if state.collision_iterations == 1:
+            sub.wake_touched(pos_before)
+        self.sync_barrier.wait()
+        state.put(own, sub, own_local)
+        self.sync_barrier.wait()
+
+        for _ in range(state.collision_iterations - 1):
+            sub.pos = state.pos[near]
+            separate_overlaps(sub.pos, sub.radius, i, j, 1)
+            self.sync_barrier.wait()
+            state.pos[own] = sub.pos[own_local]
+            self.sync_barrier.wait()
+
+        return own, own_local, pos_before
+
+
+class ParallelBallSystem(BallSystem):
+    """`BallSystem` stepped by several worker processes.
+
+    The state of all balls of `system` is copied to shared memory
+    and the sprites become views into this object. Balls cannot be
+    added or removed after the workers are started, so openings
+    in the screen edges are not supported.
+
+    Args:
+        system: populated single-process system
+        n_workers: number of worker processes (default `os.cpu_count()`)
+        max_walls: maximum number of walls
+    """
+
+    multiprocessing = True
+
+    def __init__(self,
+                 system: BallSystem,
+                 n_workers: int = None,
+                 max_walls: int = 64):
+
+        if len(system.openings) > 0:
+            raise ValueError("ParallelBallSystem does not support openings")
+
+        super().__init__((system.screen_width, system.screen_height),
+                         system.dissipation, capacity=0)
+        self.dv = system.dv
+        self.collision_iterations = system.collision_iterations
+        self.sleep_velocity = system.sleep_velocity
+        self.sleep_frames = system.sleep_frames
+        self.n_workers = n_workers if n_workers is not None else os.cpu_count()
+        self.max_walls = max_walls
+
+        n = len(system)
+        self.shared = {
+            'pos': SharedArray((n, 2), system.pos.dtype),
+            'pos_buff': SharedArray((n, 2)),
+            'velocity': SharedArray((n, 2)),
+            'awake': SharedArray((n,), bool),
+            'rest_frames': SharedArray((n,), system.rest_frames.dtype),
+            'radius': SharedArray((n,), system.radius.dtype),
+            'mass': SharedArray((n,)),
+            'control': SharedArray((5,)),
+            'walls': SharedArray((max_walls, 4), int),
+            'moving': SharedArray((max_walls,), bool)
+        }
+        for name in STATE:
+            self.shared[name].array[:] = getattr(system, name)
+            setattr(self, name, self.shared[name].array)
+
+        self.sprites = system.sprites
+        for b in self.sprites:
+            b.system = self
+
+        settings = self._settings()
+        self.start_barrier = mp.Barrier(self.n_workers + 1)
+        self.done_barrier = mp.Barrier(self.n_workers + 1)
+        sync_barrier = mp.Barrier(self.n_workers)
+        self.workers = [
+            PhysicsWorker(rank, self.n_workers, self.shared, settings,
+                          self.start_barrier, self.done_barrier, sync_barrier)
+            for rank in range(self.n_workers)
+        ]
+        for w in self.workers:
+            w.start()
+
+    def _settings(self) -> dict:
+        return {
+            'screen_dim': (self.screen_width, self.screen_height),
+            'dissipation': self.dissipation,
+            'dv': self.dv,
+            'collision_iterations': self.collision_iterations,
+            'sleep_velocity': self.sleep_velocity,
+            'sleep_frames': self.sleep_frames
+        }
+
+    @staticmethod
+    def attach(shared: dict, settings: dict) -> BallSystem:
+        """Return `BallSystem` using the shared arrays (in a worker process)."""
+        state = BallSystem(settings['screen_dim'], settings['dissipation'])
+        state.dv = settings['dv']
+        state.collision_iterations = settings['collision_iterations']
+        state.sleep_velocity = settings['sleep_velocity']
+        state.sleep_frames = settings['sleep_frames']
+        for name in STATE:
+            setattr(state, name, shared[name].array)
+        return state
+
+    def update(self,
+               pressed_keys: tuple,
+               wall_group: pygame.sprite.Group) -> None:
+        """Step all balls by one frame (in the worker processes).
+
+        Args:
+            pressed_keys: tuple returned by pygame.key.get_pressed()
+            wall_group: reference to sprite.Group containing the walls
+
+        Return:
+            None
+        """
+        rects = wall_rects(wall_group)[:self.max_walls]
+        control = self.shared['control'].array
+        control[AX], control[AY] = self.key_acceleration(pressed_keys)
+        control[N_WALLS] = len(rects)
+        control[COLLIDE] = self.frames % self.collision_every == 0
+        self.shared['walls'].array[:len(rects)] = rects
+        self.shared['moving'].array[:len(rects)] = moving_walls(wall_group)[:len(rects)]
+
+        self.start_barrier.wait()
+        self.done_barrier.wait()
+
+        # The workers are idle until the next frame
+        if self.max_awake is not None:
+            self.limit_awake(self.max_awake)
+        self.frames += 1
+
+    def add(self, ball, position, velocity=(0., 0.)):
+        raise RuntimeError("Balls cannot be added to a running ParallelBallSystem")
+
+    def despawn(self, index):
+        raise RuntimeError("Balls cannot be removed from a running ParallelBallSystem")
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if not self.workers:
+            return
+        logging.debug("Stopping physics workers")
+        self.shared['control'].array[STOP] = 1
+        self.start_barrier.wait()
+        for w in self.workers:
+            w.join()
+        self.workers = []
+
+    def __del__(self):
+        self.close()
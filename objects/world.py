@@ -0,0 +1,149 @@
+from typing import Tuple
+import logging
+
+import pygame
+import numpy as np
+
+from .ball import Ball
+from .ball_system import BallSystem
+from .wall import Wall
+from .face_walls import FaceWallManager
+from .parallel import ParallelBallSystem
+from utils import random_position
+
+
+class World:
+    """Balls and walls of the game.
+
+    Args:
+        screen_dim: screen dimensions in pixels
+        dissipation: dissipation of energy at each bounce (default 0)
+        capacity: number of preallocated balls
+        max_faces: maximum number of face walls
+
+    Attributes:
+        balls: `BallSystem` with all balls
+        wall_group: sprite.Group with all walls (including the face walls)
+        face_walls: moving walls following the detected faces
+    """
+    def __init__(self,
+                 screen_dim: Tuple[int, int],
+                 dissipation: float = 0.,
+                 capacity: int = 64,
+                 max_faces: int = 8):
+
+        self.screen_dim = screen_dim
+        self.balls = BallSystem(screen_dim, dissipation, capacity)
+        self.wall_group = pygame.sprite.Group()
+        self.face_walls = FaceWallManager(self.wall_group, max_faces)
+        self.bursts_ignored = False
+
+    @classmethod
+    def from_config(cls,
+                    config: dict,
+                    n_balls: int = None,
+                    radius: int = 10,
+                    n_walls: int = 1,
+                    seed: int = None) -> 'World':
+        """Build the game world from the configuration.
+
+        The first wall is always the same, the other ones
+        are squares at random positions.
+
+        Args:
+            config: configuration, e.g. `config.CONFIG`
+            n_balls: number of balls (default `config['n_balls']`)
+            radius: ball radius in pixels
+            n_walls: number of stationary walls
+            seed: random seed (default: not seeded)
+
+        Return:
+            World
+        """
+        if seed is not None:
+            np.random.seed(seed)
+        if n_balls is None:
+            n_balls = config['n_balls']
+
+        screen_dim = (config['screen_width'], config['screen_height'])
+        capacity = max(config['ball_capacity'], n_balls)
+        world = cls(screen_dim, config['dissipation'], capacity, config['max_faces'])
+        world.balls.sleep_velocity = config['sleep_velocity']
+        world.balls.sleep_frames = config['sleep_frames']
+        for opening in config['openings']:
+            world.balls.add_opening(*opening)
+
+        for i in range(n_balls):
+            b = Ball(radius, config['colors']['blue'])
+            world.balls.add(b, random_position(screen_dim, radius * 2))
+
+        # Sprites for the balls spawned at runtime
+        world.balls.prefill(radius, config['colors']['blue'], capacity - n_balls)
+
+        for i in range(n_walls):
+            if i == 0:
+                wall = Wall(200, 200, 300, 300)
+            else:
+                size = np.random.randint(20, 100)
+                x, y = random_position(screen_dim, size)
+                wall = Wall(x, y, x + size, y + size)
+            world.wall_group.add(wall)
+
+        if config['physics_workers'] > 0:
+            world.balls = ParallelBallSystem(world.balls, config['physics_workers'])
+
+        return world
+
+    def spawn_burst(self,
+                    center: Tuple[int, int],
+                    n_balls: int,
+                    speed: float = 3.,
+                    radius: int = 10,
+                    color: Tuple[int, int, int] = (0, 0, 255)) -> None:
+        """Spawn balls at `center` flying in random directions.
+
+        A `ParallelBallSystem` has a fixed set of balls,
+        the burst is ignored (logged once).
+
+        Args:
+            center: position of the burst
+            n_balls: number of balls
+            speed: initial speed in pixels per frame
+            radius: ball radius in pixels
+            color: fill color
+
+        Return:
+            None
+        """
+        if isinstance(self.balls, ParallelBallSystem):
+            if not self.bursts_ignored:
+                logging.warning("Ball bursts are ignored with physics workers")
+                self.bursts_ignored = True
+            return
+        angle = np.random.uniform(0, 2 * np.pi, n_balls)
+        velocity = speed * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+        position = (center[0] - radius, center[1] - radius)
+        for v in velocity.tolist():
+            self.balls.spawn(radius, color, position, v)
+
+    def step(self, pressed_keys: tuple) -> None:
+        """Step the physics by one frame.
+
+        Args:
+            pressed_keys: tuple returned by pygame.key.get_pressed()
+
+        Return:
+            None
+        """
+        self.balls.update(pressed_keys, self.wall_group)
+
+    def close(self) -> None:
+        """Stop the physics worker processes (if any)."""
+        if isinstance(self.balls, ParallelBallSystem):
+            self.balls.close()
+
+    def draw(self, surface: pygame.Surface) -> None:
+        """Draw balls and walls on the surface."""
+        self.balls.draw(surface)
+        for w in self.wall_group:
+            surface.blit(w.surf, w.rect)
@@ -1 +1 @@
-from .sharemem import SharedFrame
+from .sharemem import SharedFrame, SharedArray, SharedFrameRing, SharedDetections, SharedTelemetry
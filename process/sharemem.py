@@ -1,4 +1,5 @@
-from multiprocessing import shared_memory, Lock
+from multiprocessing import shared_memory, Lock, Condition
+import time
 import logging
 import numpy as np
 
@@ -79,7 +80,424 @@ class SharedFrame:
         shared_arr[:] = arr[:]
         self.lock.release()
 
+    def put_image(self, image):
+        """Puts image in the (height, width, channels) layout of OpenCV.
+
+        Args:
+            image (np.ndarray): image
+
+        Return:
+            None
+        """
+        self.put_array(np.swapaxes(image, 0, 1))
+
     def __del__(self):
         logging.debug(f"Unlinking {self.shm} and deleting {self}")
         self.shm.close()
         self.shm.unlink()
+
+
+class SharedArray:
+    """Shared memory block holding a NumPy array of any shape.
+
+    The shared array is initialized with zeros. The object can be
+    passed to child processes, the array is then recreated
+    from the same shared memory block.
+
+    Args:
+        shape (tuple): array shape
+        dtype (type): data type, default `np.float64`
+
+    Attributes:
+        shm: shared memory block
+        array: np.ndarray using the shared memory block as buffer
+    """
+    def __init__(self, shape, dtype=np.float64):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.owner = True
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self.array[:] = 0
+        logging.debug(f"Allocated shared memory: {self.shm}")
+
+    def __getstate__(self):
+        # Do not pickle the array, only the name of the memory block
+        return {'shape': self.shape, 'dtype': self.dtype, 'name': self.shm.name}
+
+    def __setstate__(self, state):
+        self.shape = state['shape']
+        self.dtype = state['dtype']
+        self.shm = shared_memory.SharedMemory(name=state['name'])
+        self.owner = False
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    def __del__(self):
+        logging.debug(f"Closing {self.shm}")
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedFrameRing:
+    """Ring buffer of video frames in shared memory.
+
+    The frames are written to `n_slots` slots in turn. A shared header
+    holds the sequence number of the newest complete frame, its slot
+    index and, per slot, the sequence number and capture timestamp
+    of the frame stored in it. The writer never blocks the readers:
+    it fills the slot after the newest one and then publishes it
+    by updating the header. Readers get a zero-copy view of the newest
+    complete frame together with its sequence number.
+
+    Frame `seq` is stored in slot `seq % n_slots`. A view stays valid
+    until the writer wraps around to its slot, i.e. for `n_slots - 1`
+    frames. Readers keeping a view for long can check it
+    with `is_current()`.
+
+    With `row_major` (default) the slots are stored in the native
+    (height, width, channels) image layout, i.e. the layout of OpenCV
+    images and of the pixel buffer of a 24-bit pygame surface. The camera
+    then writes its images without transposing them, and the slots can
+    be shown as surfaces without copying them
+    (see `render.FrameSurface`). `get_array()` always returns
+    the frame in the pygame (width, height, channels) layout.
+
+    Readers which want every new frame (instead of polling) can block
+    in `wait_newer()`, which is woken up by `publish()`.
+
+    Only one process is supposed to write. The header fields are
+    aligned 64-bit integers, whose stores are atomic on the supported
+    (x86-64, ARM64) platforms.
+
+    Args:
+        width (int): frame width in pixels
+        height (int): frame height in pixels
+        channels (int): number of channels
+        n_slots (int): number of slots (at least 2)
+        dtype (type): data type, default `np.uint8`
+        row_major (bool): store the slots in the (height, width, channels) layout
+
+    Attributes:
+        frames: SharedArray with all slots, shape (n_slots, height, width, channels)
+            or (n_slots, width, height, channels) if not `row_major`
+        header: SharedArray with the header
+        new_frame: condition notified when a frame is published
+    """
+    # Header layout: newest sequence number, newest slot,
+    # then sequence numbers and timestamps (ns) of all slots
+    SEQ = 0
+    SLOT = 1
+    SLOTS = 2
+
+    def __init__(self, width, height, channels=3, n_slots=3, dtype=np.uint8,
+                 row_major=True):
+        logging.debug("Initializing SharedFrameRing")
+        assert n_slots >= 2, "At least 2 slots are needed"
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.n_slots = n_slots
+        self.dtype = dtype
+        self.row_major = row_major
+        if row_major:
+            self.frames = SharedArray((n_slots, height, width, channels), dtype)
+        else:
+            self.frames = SharedArray((n_slots, width, height, channels), dtype)
+        self.header = SharedArray((self.SLOTS + 2 * n_slots,), np.int64)
+        self.header.array[self.SLOT] = 0
+        self.new_frame = Condition()
+
+    @property
+    def seq(self):
+        """Sequence number of the newest complete frame (0 = no frame yet)."""
+        return int(self.header.array[self.SEQ])
+
+    def _slot_seq(self, slot):
+        return self.header.array[self.SLOTS + slot]
+
+    def _slot_timestamp(self, slot):
+        return self.header.array[self.SLOTS + self.n_slots + slot]
+
+    def write_slot(self):
+        """Returns the slot to be written next (writer only).
+
+        The slot is marked as incomplete until `publish()` is called.
+
+        Return:
+            tuple(int, np.ndarray): slot index and a view of the slot
+            (in the storage layout)
+        """
+        slot = (self.seq + 1) % self.n_slots
+        self.header.array[self.SLOTS + slot] = -1
+        return slot, self.frames.array[slot]
+
+    def publish(self, slot, timestamp_ns=None):
+        """Publishes the frame written to `slot` as the newest one (writer only).
+
+        Args:
+            slot (int): slot index returned by `write_slot()`
+            timestamp_ns (int): capture time from `time.perf_counter_ns()`
+                (default: now)
+
+        Return:
+            int: sequence number of the frame
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.perf_counter_ns()
+        header = self.header.array
+        seq = int(header[self.SEQ]) + 1
+        header[self.SLOTS + self.n_slots + slot] = timestamp_ns
+        header[self.SLOTS + slot] = seq
+        header[self.SLOT] = slot
+        header[self.SEQ] = seq
+        with self.new_frame:
+            self.new_frame.notify_all()
+        return seq
+
+    def _view(self, slot):
+        """Slot in the pygame (width, height, channels) layout."""
+        frame = self.frames.array[slot]
+        return np.swapaxes(frame, 0, 1) if self.row_major else frame
+
+    def put_array(self, arr, timestamp_ns=None):
+        """Copies array to the next slot and publishes it.
+
+        Args:
+            arr (np.ndarray): array (width, height, channels)
+            timestamp_ns (int): capture time (default: now)
+
+        Return:
+            int: sequence number of the frame
+        """
+        slot, _ = self.write_slot()
+        self._view(slot)[:] = arr
+        return self.publish(slot, timestamp_ns)
+
+    def put_image(self, image, timestamp_ns=None):
+        """Copies image to the next slot and publishes it.
+
+        Args:
+            image (np.ndarray): image (height, width, channels)
+            timestamp_ns (int): capture time (default: now)
+
+        Return:
+            int: sequence number of the frame
+        """
+        return self.put_array(np.swapaxes(image, 0, 1), timestamp_ns)
+
+    def get_latest(self):
+        """Gets the newest complete frame.
+
+        Return:
+            tuple(np.ndarray, int, int): zero-copy view of the frame
+            (width, height, channels), its sequence number
+            and capture timestamp (ns)
+        """
+        slot = int(self.header.array[self.SLOT])
+        seq = int(self._slot_seq(slot))
+        timestamp_ns = int(self._slot_timestamp(slot))
+        return self._view(slot), max(seq, 0), timestamp_ns
+
+    def get_frame(self, seq):
+        """Gets the frame `seq` if it is still in the ring.
+
+        The view is valid only while `is_current(seq)` holds.
+
+        Return:
+            np.ndarray: zero-copy view of the frame (width, height, channels),
+            None if it has been overwritten
+        """
+        if seq <= 0 or not self.is_current(seq):
+            return None
+        return self._view(seq % self.n_slots)
+
+    def get_array(self):
+        """Gets the newest complete frame (zero-copy view).
+
+        Return:
+            np.ndarray
+        """
+        return self.get_latest()[0]
+
+    def newer_than(self, seq):
+        """Checks if a frame newer than `seq` has been published."""
+        return self.header.array[self.SEQ] > seq
+
+    def wait_newer(self, seq, timeout=None):
+        """Blocks until a frame newer than `seq` is published.
+
+        Args:
+            seq (int): sequence number of the last frame seen
+            timeout (float): maximum waiting time in seconds (default: no limit)
+
+        Return:
+            bool: False if the timeout expired
+        """
+        with self.new_frame:
+            return self.new_frame.wait_for(lambda: self.newer_than(seq), timeout)
+
+    def is_current(self, seq):
+        """Checks if the frame `seq` has not been overwritten yet."""
+        return int(self._slot_seq(seq % self.n_slots)) == seq
+
+
+class SharedDetections:
+    """Newest detection result in shared memory.
+
+    A fixed-size record holding up to `capacity` boxes, their count,
+    the sequence number and capture timestamp of the source frame
+    and the time the detection finished. It always holds the newest
+    result only, so a slow reader never falls behind and nothing
+    is pickled.
+
+    The record is written with a seqlock: the writer makes the version
+    odd, writes the fields and makes it even again. A reader copies
+    the fields and retries if the version was odd or changed meanwhile.
+    Only one process is supposed to write.
+
+    Args:
+        capacity (int): maximum number of boxes
+
+    Attributes:
+        record: SharedArray with the header and the boxes (int64)
+    """
+    # Record layout: header fields, then the boxes [left, top, right, bottom]
+    VERSION = 0
+    COUNT = 1
+    FRAME_SEQ = 2
+    FRAME_TIMESTAMP = 3
+    TIMESTAMP = 4
+    BOXES = 5
+
+    def __init__(self, capacity=16):
+        logging.debug("Initializing SharedDetections")
+        self.capacity = capacity
+        self.record = SharedArray((self.BOXES + 4 * capacity,), np.int64)
+
+    @property
+    def version(self):
+        """Version of the record, even and growing with each write."""
+        return int(self.record.array[self.VERSION]) & ~1
+
+    def write(self, boxes, frame_seq, frame_timestamp_ns, timestamp_ns=None):
+        """Replaces the record (writer only).
+
+        Boxes beyond the capacity are dropped.
+
+        Args:
+            boxes (np.ndarray): boxes, array of [left, top, right, bottom]
+            frame_seq (int): sequence number of the source frame
+            frame_timestamp_ns (int): capture time of the source frame
+            timestamp_ns (int): detection time from `time.perf_counter_ns()`
+                (default: now)
+
+        Return:
+            None
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.perf_counter_ns()
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        if len(boxes) > self.capacity:
+            logging.warning(f"{len(boxes)} detections, keeping {self.capacity}")
+            boxes = boxes[:self.capacity]
+
+        record = self.record.array
+        version = int(record[self.VERSION])
+        record[self.VERSION] = version + 1
+        record[self.COUNT] = len(boxes)
+        record[self.FRAME_SEQ] = frame_seq
+        record[self.FRAME_TIMESTAMP] = frame_timestamp_ns
+        record[self.TIMESTAMP] = timestamp_ns
+        record[self.BOXES:self.BOXES + boxes.size] = boxes.ravel()
+        record[self.VERSION] = version + 2
+
+    def read(self):
+        """Reads the newest record.
+
+        Return:
+            tuple(np.ndarray, int, int, int, int): boxes (count, 4),
+            source frame sequence number and capture timestamp (ns),
+            detection timestamp (ns) and version of the record
+        """
+        record = self.record.array
+        while True:
+            version = int(record[self.VERSION])
+            if version & 1:
+                continue
+            header = record[:self.BOXES].copy()
+            count = min(int(header[self.COUNT]), self.capacity)
+            boxes = record[self.BOXES:self.BOXES + 4 * count].reshape(-1, 4).copy()
+            if int(record[self.VERSION]) == version:
+                return (boxes, int(header[self.FRAME_SEQ]),
+                        int(header[self.FRAME_TIMESTAMP]),
+                        int(header[self.TIMESTAMP]), version)
+
+
+class SharedTelemetry:
+    """Health counters of a child process in shared memory.
+
+    A record of named float64 fields (counters, timestamps, exponential
+    moving averages of latencies and the CPU time), updated by one
+    process without locks: each field is an aligned 64-bit word,
+    whose stores are atomic on the supported platforms. Other processes
+    sample the record with one copy, the fields of a sample may come
+    from consecutive updates. Timestamps are `time.perf_counter_ns()`
+    values.
+
+    Args:
+        fields (tuple): names of the fields
+        alpha (float): weight of a new value in the moving averages
+
+    Attributes:
+        record: SharedArray with the fields (float64)
+    """
+    def __init__(self, fields, alpha=0.1):
+        logging.debug("Initializing SharedTelemetry")
+        self.fields = tuple(fields) + ('cpu_ms', 'cpu_percent')
+        self.index = {name: k for k, name in enumerate(self.fields)}
+        self.alpha = alpha
+        self.record = SharedArray((len(self.fields),), np.float64)
+        self.cpu_time = None
+        self.wall_time = None
+
+    def add(self, name, n=1):
+        """Increments the counter `name` (writer only)."""
+        self.record.array[self.index[name]] += n
+
+    def set(self, name, value):
+        """Sets the field `name` (writer only)."""
+        self.record.array[self.index[name]] = value
+
+    def average(self, name, value):
+        """Adds a value to the moving average `name` (writer only)."""
+        k = self.index[name]
+        record = self.record.array
+        record[k] = value if record[k] == 0 else record[k] + self.alpha * (value - record[k])
+
+    def update_cpu(self, period=1.):
+        """Updates the CPU time of the writer process (writer only).
+
+        Args:
+            period (float): the CPU load in percent is updated
+                every `period` seconds
+        """
+        cpu_time = time.process_time()
+        wall_time = time.perf_counter()
+        self.set('cpu_ms', cpu_time * 1e3)
+        if self.wall_time is None:
+            self.cpu_time, self.wall_time = cpu_time, wall_time
+        elif wall_time - self.wall_time >= period:
+            self.set('cpu_percent',
+                     100. * (cpu_time - self.cpu_time) / (wall_time - self.wall_time))
+            self.cpu_time, self.wall_time = cpu_time, wall_time
+
+    def sample(self):
+        """Copies the record.
+
+        Return:
+            dict: {field: value}
+        """
+        return dict(zip(self.fields, self.record.array.tolist()))
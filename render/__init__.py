@@ -0,0 +1,2 @@
+from .dirty import DirtyRectRenderer
+from .frame_surface import FrameSurface
@@ -0,0 +1,178 @@
+"""Dirty-rectangle rendering.
+
+The screen is divided into square tiles. Only the tiles which changed
+since the previous frame (balls and walls which moved, face boxes,
+camera tiles whose contents changed beyond a threshold) are redrawn
+and pushed to the display with `pygame.display.update(rects)`.
+"""
+import pygame
+import numpy as np
+
+
+class DirtyRectRenderer:
+    """Renderer updating only the changed regions of the screen.
+
+    Args:
+        screen: display surface
+        tile_size: tile size in pixels
+        threshold: mean absolute difference (0-255) of a camera tile
+            above which the tile is redrawn
+        max_dirty_fraction: if a larger fraction of the screen is dirty,
+            the whole screen is redrawn and flipped
+        sample_step: the camera frame is subsampled with this step
+            when comparing tiles
+
+    Attributes:
+        saved_fraction: fraction of the screen area not updated in the last frame
+        saved_total: sum of `saved_fraction` over all frames
+        frames: number of rendered frames
+    """
+    def __init__(self,
+                 screen: pygame.Surface,
+                 tile_size: int = 40,
+                 threshold: float = 8.,
+                 max_dirty_fraction: float = 0.5,
+                 sample_step: int = 4):
+
+        assert tile_size % sample_step == 0, \
+            "Tile size must be a multiple of the sample step"
+
+        self.screen = screen
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.max_dirty_fraction = max_dirty_fraction
+        self.sample_step = sample_step
+
+        width, height = screen.get_size()
+        self.n_tiles = (-(-width // tile_size), -(-height // tile_size))
+        self.screen_rect = screen.get_rect()
+
+        # Camera contents last pushed to the display, per subsampled pixel
+        self.reference = None
+
+        # Tiles covered by objects in the previous frame
+        self.prev_objects = np.zeros(self.n_tiles, dtype=bool)
+
+        self.saved_fraction = 0.
+        self.saved_total = 0.
+        self.frames = 0
+
+    def _mark_rects(self, grid, rects):
+        """Mark tiles overlapped by rects [left, top, right, bottom]."""
+        t = self.tile_size
+        for left, top, right, bottom in rects:
+            grid[max(left, 0) // t:max(right - 1, 0) // t + 1,
+                 max(top, 0) // t:max(bottom - 1, 0) // t + 1] = True
+
+    def _mark_balls(self, grid, pos, size):
+        """Mark tiles overlapped by balls (vectorized)."""
+        if len(pos) == 0:
+            return
+        t = self.tile_size
+        nx, ny = self.n_tiles
+        far = pos + size[:, np.newaxis] - 1
+        span = int(size.max()) if len(size) > 0 else 0
+        # Tiles under the corners of the bounding box
+        # (and in between, if the balls are larger than the tiles)
+        for dx in range(0, span + t, t):
+            for dy in range(0, span + t, t):
+                x = np.minimum(pos[:, 0] + dx, far[:, 0]) // t
+                y = np.minimum(pos[:, 1] + dy, far[:, 1]) // t
+                grid[np.clip(x, 0, nx - 1), np.clip(y, 0, ny - 1)] = True
+
+    def _changed_tiles(self, frame):
+        """Mark camera tiles which differ from the reference."""
+        s = self.sample_step
+        sample = frame[::s, ::s].astype(np.int16)
+        if self.reference is None or self.reference.shape != sample.shape:
+            self.reference = sample
+            return np.ones(self.n_tiles, dtype=bool)
+
+        diff = np.abs(sample - self.reference).sum(axis=2)
+        k = self.tile_size // s
+        xs = np.arange(0, diff.shape[0], k)
+        ys = np.arange(0, diff.shape[1], k)
+        sums = np.add.reduceat(np.add.reduceat(diff, xs, axis=0), ys, axis=1)
+        counts = np.outer(np.diff(np.append(xs, diff.shape[0])),
+                          np.diff(np.append(ys, diff.shape[1]))) * frame.shape[2]
+        changed = sums / counts > self.threshold
+
+        # Remember what will be displayed in the redrawn tiles
+        mask = np.repeat(np.repeat(changed, k, axis=0), k, axis=1)
+        mask = mask[:diff.shape[0], :diff.shape[1]]
+        self.reference[mask] = sample[mask]
+
+        return changed
+
+    def _grid_to_rects(self, grid):
+        """Merge horizontal runs of dirty tiles into rectangles."""
+        t = self.tile_size
+        rects = []
+        padded = np.zeros((grid.shape[0] + 2, grid.shape[1]), dtype=np.int8)
+        padded[1:-1] = grid
+        edges = np.diff(padded, axis=0)
+        for y in range(grid.shape[1]):
+            starts = np.flatnonzero(edges[:, y] == 1)
+            ends = np.flatnonzero(edges[:, y] == -1)
+            for x0, x1 in zip(starts.tolist(), ends.tolist()):
+                rect = pygame.Rect(x0 * t, y * t, (x1 - x0) * t, t)
+                rects.append(rect.clip(self.screen_rect))
+        return rects
+
+    def draw(self,
+             background: pygame.Surface,
+             frame: np.ndarray,
+             world,
+             boxes: np.ndarray,
+             box_color=(0, 255, 0),
+             box_thickness: int = 5) -> None:
+        """Draw the frame and update the display.
+
+        Args:
+            background: camera frame as a surface
+            frame: camera frame as an array (width, height, channel)
+            world: `objects.World` to draw
+            boxes: face boxes, array of [left, top, right, bottom]
+            box_color: color of the face boxes
+            box_thickness: line thickness of the face boxes
+
+        Return:
+            None
+        """
+        boxes = np.asarray(boxes).reshape(-1, 4).tolist()
+
+        objects = np.zeros(self.n_tiles, dtype=bool)
+        balls = world.balls
+        self._mark_balls(objects, balls.pos, 2 * balls.radius)
+        self._mark_rects(objects, [(w.rect.left, w.rect.top, w.rect.right, w.rect.bottom)
+                                   for w in world.wall_group])
+        self._mark_rects(objects, [(l - box_thickness, t - box_thickness,
+                                    r + box_thickness, b + box_thickness)
+                                   for l, t, r, b in boxes])
+
+        dirty = self._changed_tiles(frame) | objects | self.prev_objects
+        self.prev_objects = objects
+
+        dirty_fraction = dirty.mean()
+        full = dirty_fraction > self.max_dirty_fraction
+
+        if full:
+            self.screen.blit(background, (0, 0))
+        else:
+            rects = self._grid_to_rects(dirty)
+            self.screen.blits([(background, r, r) for r in rects], doreturn=False)
+
+        for left, top, right, bottom in boxes:
+            pygame.draw.rect(self.screen, box_color,
+                             (left, top, right - left, bottom - top), box_thickness)
+        world.draw(self.screen)
+
+        if full:
+            pygame.display.flip()
+            self.saved_fraction = 0.
+        else:
+            pygame.display.update(rects)
+            self.saved_fraction = 1. - dirty_fraction
+
+        self.saved_total += self.saved_fraction
+        self.frames += 1
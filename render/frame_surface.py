@@ -0,0 +1,57 @@
+"""Camera frames as pygame surfaces.
+
+`pygame.surfarray.make_surface()` allocates a new surface and copies
+the frame into it, every frame. `FrameSurface` avoids both:
+
+- frames stored in a row-major `process.SharedFrameRing` are shown
+  through surfaces created once per slot with `pygame.image.frombuffer()`,
+  which use the shared memory as their pixel buffer (no copy),
+- any other frame is copied into one persistent surface
+  with `pygame.surfarray.blit_array()` (one copy, no allocation).
+"""
+import logging
+
+import pygame
+import numpy as np
+
+
+class FrameSurface:
+    """Surface showing the current camera frame.
+
+    Args:
+        size: frame size (width, height) in pixels
+        ring: shared frame ring buffer (optional)
+    """
+    def __init__(self,
+                 size: tuple,
+                 ring=None):
+
+        self.size = tuple(size)
+        self.surface = None
+
+        # Surface of each ring slot, by the address of its pixel data
+        self.slot_surfaces = {}
+        if ring is not None and getattr(ring, 'row_major', False) \
+                and ring.channels == 3 and ring.dtype == np.uint8:
+            logging.debug("Camera frames are shown without copying")
+            for slot in ring.frames.array:
+                address = slot.__array_interface__['data'][0]
+                self.slot_surfaces[address] = pygame.image.frombuffer(slot, self.size, 'RGB')
+
+    def update(self, frame: np.ndarray) -> pygame.Surface:
+        """Return a surface showing the frame.
+
+        Args:
+            frame: camera frame (width, height, channel)
+
+        Return:
+            pygame.Surface, valid until the next call
+        """
+        surf = self.slot_surfaces.get(frame.__array_interface__['data'][0])
+        if surf is not None:
+            return surf
+
+        if self.surface is None:
+            self.surface = pygame.Surface(self.size)
+        pygame.surfarray.blit_array(self.surface, frame)
+        return self.surface
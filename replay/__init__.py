@@ -0,0 +1,2 @@
+from .session import SessionRecorder, SessionPlayer, world_checksum
+from .sources import ReplayCamera, ReplayFaceDetector
@@ -0,0 +1,187 @@
+"""Recording and replay of game sessions.
+
+A session is a directory with:
+
+- `session.jsonl`: a header line (format version, random seed and the
+  configuration the world was built from), one line per frame
+  (pressed arrow keys, number of ball bursts, face boxes, whether a new
+  camera frame was captured, quality level) and a last line with the
+  number of frames and a checksum of the final world state,
+- `camera.mp4` (optional): the captured camera frames.
+
+Replaying the inputs with the same seed reproduces the game exactly,
+which `SessionPlayer.check()` verifies with the checksum.
+"""
+import os
+import json
+import zlib
+import logging
+
+import cv2
+import pygame
+import numpy as np
+
+from utils import PressedKeys
+
+FORMAT = 1
+
+# Keys read by the game in every frame
+GAME_KEYS = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+
+# Configuration the world is built from and stepped with (taken from the session
+# on replay): physics workers ignore bursts, the quality governor caps the awake balls
+WORLD_KEYS = ('fps', 'screen_width', 'screen_height', 'n_balls', 'ball_capacity',
+              'openings', 'dissipation', 'sleep_velocity', 'sleep_frames', 'max_faces',
+              'physics_workers', 'governor_max_awake')
+
+INPUTS = 'session.jsonl'
+VIDEO = 'camera.mp4'
+
+
+def world_checksum(world) -> int:
+    """Return the CRC32 of the positions and velocities of all balls."""
+    balls = world.balls
+    return zlib.crc32(np.ascontiguousarray(balls.velocity).tobytes(),
+                      zlib.crc32(np.ascontiguousarray(balls.pos).tobytes()))
+
+
+class SessionRecorder:
+    """Records the inputs of a game session.
+
+    Args:
+        path: session directory (created if needed)
+        seed: random seed the world was built with
+        config: configuration, e.g. `config.CONFIG`
+        video: also record the captured camera frames
+    """
+    def __init__(self,
+                 path: str,
+                 seed: int,
+                 config: dict,
+                 video: bool = False):
+
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.frames = 0
+        self.file = open(os.path.join(path, INPUTS), 'w')
+        header = {'format': FORMAT, 'seed': seed,
+                  'config': {k: config[k] for k in WORLD_KEYS}}
+        self.file.write(json.dumps(header) + '\n')
+
+        self.writer = None
+        if video:
+            size = (config['screen_width'], config['screen_height'])
+            self.writer = cv2.VideoWriter(os.path.join(path, VIDEO),
+                                          cv2.VideoWriter_fourcc(*'mp4v'),
+                                          config['fps'], size)
+            self.bgr = np.empty((size[1], size[0], 3), np.uint8)
+        logging.info(f"Recording the session to {path} (seed {seed})")
+
+    def frame(self,
+              pressed_keys,
+              bursts: int,
+              boxes: np.ndarray,
+              captured: bool,
+              level: int = 0,
+              camera_frame: np.ndarray = None) -> None:
+        """Record the inputs of a frame.
+
+        Args:
+            pressed_keys: tuple returned by pygame.key.get_pressed()
+            bursts: number of ball bursts
+            boxes: face boxes, array of [left, top, right, bottom]
+            captured: a new camera frame was captured in this frame
+            level: quality level (see `utils.QualityGovernor`)
+            camera_frame: captured camera frame (width, height, channel)
+
+        Return:
+            None
+        """
+        record = {
+            'keys': [k for k in GAME_KEYS if pressed_keys[k]],
+            'bursts': bursts,
+            'boxes': np.asarray(boxes, dtype=int).reshape(-1, 4).tolist(),
+            'captured': captured,
+            'level': level
+        }
+        self.file.write(json.dumps(record) + '\n')
+        if self.writer is not None and captured:
+            cv2.cvtColor(np.swapaxes(camera_frame, 0, 1), cv2.COLOR_RGB2BGR, dst=self.bgr)
+            self.writer.write(self.bgr)
+        self.frames += 1
+
+    def close(self, world=None) -> None:
+        """Write the number of frames and the checksum of the world, and close the files."""
+        if self.file is None:
+            return
+        end = {'frames': self.frames,
+               'checksum': world_checksum(world) if world is not None else None}
+        self.file.write(json.dumps(end) + '\n')
+        self.file.close()
+        self.file = None
+        if self.writer is not None:
+            self.writer.release()
+        logging.info(f"Recorded {self.frames} frames to {self.path}")
+
+
+class SessionPlayer:
+    """Plays back the inputs of a recorded session, frame by frame.
+
+    Args:
+        path: session directory
+
+    Attributes:
+        seed: random seed of the world
+        config: configuration of the world
+        frames: recorded frames
+        index: index of the current frame (-1 before the first one)
+        frame: inputs of the current frame
+        video: path of the camera video (None if not recorded)
+    """
+    def __init__(self, path: str):
+        with open(os.path.join(path, INPUTS)) as f:
+            lines = [json.loads(line) for line in f]
+        header = lines[0]
+        if header['format'] != FORMAT:
+            raise ValueError(f"Unsupported session format {header['format']}")
+        self.seed = header['seed']
+        self.config = header['config']
+        self.frames = [line for line in lines[1:] if 'keys' in line]
+        self.end = lines[-1] if 'checksum' in lines[-1] else None
+        video = os.path.join(path, VIDEO)
+        self.video = video if os.path.isfile(video) else None
+        self.index = -1
+        self.frame = None
+        logging.info(f"Replaying {len(self.frames)} frames from {path} (seed {self.seed})")
+
+    def advance(self) -> bool:
+        """Move to the next frame, False at the end of the session."""
+        if self.index + 1 >= len(self.frames):
+            return False
+        self.index += 1
+        self.frame = self.frames[self.index]
+        return True
+
+    def pressed_keys(self) -> PressedKeys:
+        """Return the keys pressed in the current frame."""
+        return PressedKeys(self.frame['keys'])
+
+    def check(self, world) -> bool:
+        """Compare the world with the recorded final state (logged).
+
+        Return:
+            bool: True if the states match (or nothing to compare)
+        """
+        if self.end is None or self.end['checksum'] is None:
+            logging.info("No final state recorded, replay not compared")
+            return True
+        if self.index + 1 != self.end['frames']:
+            logging.info("Replay stopped before the end, final state not compared")
+            return True
+        checksum = world_checksum(world)
+        if checksum != self.end['checksum']:
+            logging.warning(f"Replay diverged: world checksum {checksum}, "
+                            f"recorded {self.end['checksum']}")
+            return False
+        logging.info(f"Replay matches the recording (checksum {checksum})")
+        return True
@@ -0,0 +1,69 @@
+"""Camera and face detector replaying a recorded session.
+
+They have the interfaces of `camera.LocalCamera` and
+`face.LocalFaceDetector` and need no camera or detection backend.
+"""
+import cv2
+import numpy as np
+
+
+class ReplayCamera:
+    """Camera returning the recorded camera frames.
+
+    Without a recorded video every frame is plain gray.
+
+    Args:
+        player: `SessionPlayer` of the session
+        size: frame size (width, height) in pixels
+    """
+
+    multiprocessing = False
+
+    def __init__(self, player, size):
+        self.size = tuple(size)
+        self.cap = cv2.VideoCapture(player.video) if player.video is not None else None
+        self.raw = None
+        self.rgb = np.full((self.size[1], self.size[0], 3), 128, np.uint8)
+
+    def capture_frame(self):
+        """Return the next recorded frame (width, height, channel)."""
+        if self.cap is not None:
+            ret, raw = self.cap.read(self.raw)
+            if ret:
+                self.raw = raw
+                if raw.shape[1::-1] != self.size:
+                    raw = cv2.resize(raw, self.size)
+                cv2.cvtColor(raw, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        return np.swapaxes(self.rgb, 0, 1)
+
+    def frame_is_current(self):
+        """Checks if the last captured frame can still be shown (always)."""
+        return True
+
+    def __del__(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+class ReplayFaceDetector:
+    """Face detector returning the recorded face boxes.
+
+    Args:
+        player: `SessionPlayer` of the session
+    """
+
+    multiprocessing = False
+
+    def __init__(self, player):
+        self.player = player
+
+    def throttle(self, factor):
+        """The recorded boxes do not depend on the detection rate."""
+
+    def detect(self, frame):
+        """Return the face boxes of the current frame.
+
+        Return:
+            np.ndarray: detections, array of [left, top, right, bottom]
+        """
+        return np.asarray(self.player.frame['boxes'], dtype=int).reshape(-1, 4)
@@ -0,0 +1,102 @@
+"""Batched collision functions against the scalar ones.
+
+Run from the repository root: `python -m pytest tests`
+"""
+import numpy as np
+
+from objects.collisions import ball_elastic_collision, ball_elastic_collision_batch, \
+    separate_overlaps
+
+
+def test_batch_matches_scalar_on_disjoint_pairs():
+    rng = np.random.default_rng(0)
+    n = 20
+    velocity = rng.uniform(-10, 10, (n, 2))
+    mass = rng.uniform(1, 5, n)
+    centers = rng.uniform(0, 500, (n, 2))
+    i, j = np.arange(0, n, 2), np.arange(1, n, 2)
+
+    result = ball_elastic_collision_batch(velocity, mass, centers, i, j, dissipation=0.1)
+
+    for a, b in zip(i, j):
+        v1, v2 = ball_elastic_collision(velocity[a].copy(), velocity[b].copy(),
+                                        mass[a], mass[b], centers[a], centers[b], 0.1)
+        np.testing.assert_allclose(result[a], v1)
+        np.testing.assert_allclose(result[b], v2)
+
+
+def momentum_energy(velocity, mass):
+    """Return the total momentum and kinetic energy."""
+    momentum = (mass[:, np.newaxis] * velocity).sum(axis=0)
+    energy = (mass * (velocity ** 2).sum(axis=1)).sum() / 2
+    return momentum, energy
+
+
+def test_batch_shared_ball_conserves_momentum():
+    # One moving ball hitting three resting balls
+    velocity = np.array([[5., 0.], [0., 0.], [0., 0.], [0., 0.]])
+    mass = np.ones(4)
+    centers = np.array([[0., 0.], [19., 3.], [19., -3.], [20., 0.]])
+    i, j = np.array([0, 0, 0]), np.array([1, 2, 3])
+
+    result = ball_elastic_collision_batch(velocity, mass, centers, i, j)
+
+    p0, e0 = momentum_energy(velocity, mass)
+    p1, e1 = momentum_energy(result, mass)
+    np.testing.assert_allclose(p1, p0)
+    assert e1 <= e0 + 1e-9
+
+
+def test_batch_clusters_conserve_momentum():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        n = 30
+        velocity = rng.uniform(-10, 10, (n, 2))
+        mass = rng.uniform(1, 5, n)
+        centers = rng.uniform(0, 100, (n, 2))
+        i, j = np.triu_indices(n, 1)
+        pairs = rng.random(len(i)) < 0.1
+
+        result = ball_elastic_collision_batch(velocity, mass, centers, i[pairs], j[pairs])
+
+        p0, e0 = momentum_energy(velocity, mass)
+        p1, e1 = momentum_energy(result, mass)
+        np.testing.assert_allclose(p1, p0, atol=1e-9)
+        assert e1 <= e0 + 1e-9
+
+
+def test_batch_damps_shared_ball():
+    velocity = np.array([[5., 0.], [0., 0.], [0., 0.], [0., 0.]])
+    mass = np.ones(4)
+    centers = np.array([[0., 0.], [19., 3.], [19., -3.], [20., 0.]])
+    i, j = np.array([0, 0, 0]), np.array([1, 2, 3])
+    d = 0.2
+
+    undamped = ball_elastic_collision_batch(velocity, mass, centers, i, j)
+    result = ball_elastic_collision_batch(velocity, mass, centers, i, j, dissipation=d)
+
+    # (1 - d / 2) ** k for a ball in k pairs
+    np.testing.assert_allclose(result[0], undamped[0] * (1 - d / 2) ** 3)
+    np.testing.assert_allclose(result[1:], undamped[1:] * (1 - d / 2))
+
+
+def test_separate_overlaps_matches_pixel_shift():
+    rng = np.random.default_rng(2)
+    for _ in range(100):
+        radius = rng.integers(5, 30, 2)
+        pos = rng.integers(0, 40, (2, 2))
+        before = pos.copy()
+        separate_overlaps(pos, radius, np.array([0]), np.array([1]), iterations=1)
+
+        # Per-pair correction of the former loop in BallSystem.collide()
+        c1, c2 = before[0] + radius[0], before[1] + radius[1]
+        dist_x, dist_y = c1 - c2
+        distance = max(np.sqrt(dist_x ** 2 + dist_y ** 2), 1e-3)
+        overlap = radius[0] + radius[1] - distance
+        if overlap < 0:
+            np.testing.assert_array_equal(pos, before)
+            continue
+        dx = int((overlap + 0.5) * dist_x / distance)
+        dy = int((overlap + 0.5) * dist_y / distance)
+        np.testing.assert_array_equal(pos[0], before[0] + (dx, dy))
+        np.testing.assert_array_equal(pos[1], before[1] - (dx, dy))
@@ -0,0 +1,64 @@
+"""Recording and replay of a session under a different configuration.
+
+Run from the repository root: `python -m pytest tests`
+"""
+import os
+
+import pygame
+import pytest
+
+from config import CONFIG
+from objects import World
+from replay import SessionRecorder, SessionPlayer
+from utils import PressedKeys, QualityGovernor
+
+
+class NoDetector:
+    """Face detector without detections (only throttled by the governor)."""
+    def throttle(self, factor):
+        pass
+
+
+@pytest.fixture(scope='module', autouse=True)
+def display():
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    pygame.init()
+    pygame.display.set_mode((CONFIG['screen_width'], CONFIG['screen_height']))
+    yield
+    pygame.quit()
+
+
+def make_game(config, seed):
+    world = World.from_config(config, seed=seed)
+    governor = QualityGovernor(config['fps'], NoDetector(), world.balls, enabled=False,
+                               max_awake=config['governor_max_awake'])
+    return world, governor
+
+
+def test_replay_at_lowest_quality_under_other_config(tmp_path):
+    # Record with the awake balls capped (level 4)
+    recorded = dict(CONFIG, n_balls=80, physics_workers=0, governor_max_awake=10)
+    world, governor = make_game(recorded, seed=7)
+    governor.set_level(4)
+    recorder = SessionRecorder(str(tmp_path), 7, recorded)
+    boxes = [[300, 200, 400, 300]]
+    for frame in range(200):
+        keys = PressedKeys([pygame.K_DOWN] if frame < 100 else [pygame.K_LEFT])
+        world.face_walls.update(boxes)
+        world.step(keys)
+        recorder.frame(keys, 0, boxes, True, governor.level)
+    recorder.close(world)
+
+    # Replay with a configuration differing in every recorded key
+    current = dict(CONFIG, n_balls=30, dissipation=0.5, sleep_frames=5,
+                   physics_workers=0, governor_max_awake=500, max_faces=1)
+    player = SessionPlayer(str(tmp_path))
+    current.update(player.config)
+    world, governor = make_game(current, player.seed)
+    while player.advance():
+        if player.frame['level'] != governor.level:
+            governor.set_level(player.frame['level'])
+        world.face_walls.update(player.frame['boxes'])
+        world.step(player.pressed_keys())
+
+    assert player.check(world)
@@ -1 +1,4 @@
-from .utils import random_color, random_position
+from .utils import random_color, random_position, PressedKeys
+from .profiler import FrameProfiler
+from .governor import QualityGovernor
+from .synthetic import draw_face, synthetic_frame
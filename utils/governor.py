@@ -0,0 +1,135 @@
+"""Adaptive quality governor.
+
+Keeps the frame time within the budget of the target frame rate
+by lowering the quality step by step under load:
+
+    level 0: full quality
+    level 1: lower face detection rate
+    level 2: + ball-ball collisions every other frame
+    level 3: + camera background updated every few frames
+    level 4: + cap on the number of awake balls
+
+Each level keeps the degradations of the lower ones. The frame time
+measured is the work time of the frame, without the wait in
+`clock.tick()` (`pygame.time.Clock.get_rawtime()`). A level is entered
+when the mean work time of the last `window` frames exceeds
+`degrade_at` of the budget, and left when it falls below `restore_at`
+of the budget (hysteresis). After a change the governor waits
+`cooldown` frames, so that the effect of the change is measured.
+"""
+import logging
+
+import numpy as np
+
+LEVELS = ('full', 'detection', 'physics', 'background', 'balls')
+
+
+class QualityGovernor:
+    """Frame time governor stepping through the quality levels.
+
+    Args:
+        fps: target frame rate
+        face_detector: face detector with a `throttle(factor)` method
+        balls: `objects.BallSystem` (or `ParallelBallSystem`) of the world
+        enabled: adapt the quality (if False, the level changes
+            only with `set_level()`)
+        window: number of frames of the mean work time
+        cooldown: number of frames after a change without another change
+        degrade_at: fraction of the budget above which the quality is lowered
+        restore_at: fraction of the budget below which the quality is restored
+        detection_factor: fraction of the detection rate kept from level 1
+        collision_every: ball-ball collisions every n-th frame from level 2
+        background_every: camera background update every n-th frame from level 3
+        max_awake: maximum number of awake balls at level 4
+
+    Attributes:
+        level: current quality level (index in `LEVELS`)
+        background_every: the camera background is updated every n-th frame
+        changes: list of (frame, level, mean work time in ms) of the level changes
+        frames: number of frames seen
+    """
+    def __init__(self,
+                 fps: float,
+                 face_detector,
+                 balls,
+                 enabled: bool = True,
+                 window: int = 30,
+                 cooldown: int = 60,
+                 degrade_at: float = 0.9,
+                 restore_at: float = 0.6,
+                 detection_factor: float = 0.5,
+                 collision_every: int = 2,
+                 background_every: int = 2,
+                 max_awake: int = 100):
+
+        self.enabled = enabled
+        self.budget_ms = 1000. / fps
+        self.face_detector = face_detector
+        self.balls = balls
+        self.window = window
+        self.cooldown = cooldown
+        self.degrade_at = degrade_at
+        self.restore_at = restore_at
+        self.settings = {
+            'detection_factor': detection_factor,
+            'collision_every': collision_every,
+            'background_every': background_every,
+            'max_awake': max_awake
+        }
+        self.work_ms = np.zeros(window)
+        self.level = 0
+        self.background_every = 1
+        self.changes = []
+        self.frames = 0
+        self.last_change = 0
+
+    def update(self, work_ms: float) -> int:
+        """Add the work time of a frame and change the level if needed.
+
+        Args:
+            work_ms: time of the frame without waiting, in ms
+
+        Return:
+            int: quality level
+        """
+        self.work_ms[self.frames % self.window] = work_ms
+        self.frames += 1
+        if not self.enabled or self.frames < self.window \
+                or self.frames - self.last_change < self.cooldown:
+            return self.level
+
+        mean_ms = float(self.work_ms.mean())
+        if mean_ms > self.degrade_at * self.budget_ms and self.level < len(LEVELS) - 1:
+            self.set_level(self.level + 1, mean_ms)
+        elif mean_ms < self.restore_at * self.budget_ms and self.level > 0:
+            self.set_level(self.level - 1, mean_ms)
+        return self.level
+
+    def set_level(self, level: int, mean_ms: float = float('nan')) -> None:
+        """Apply the quality level.
+
+        Args:
+            level: quality level (index in `LEVELS`)
+            mean_ms: mean work time which caused the change (for the log)
+
+        Return:
+            None
+        """
+        direction = 'Lowering' if level > self.level else 'Restoring'
+        reason = 'requested'
+        if not np.isnan(mean_ms):
+            reason = f"work time {mean_ms:.1f} ms, budget {self.budget_ms:.1f} ms"
+        logging.info(f"{direction} quality to level {level} ({LEVELS[level]}): {reason}")
+        self.level = level
+        self.changes.append((self.frames, level, mean_ms))
+        self.last_change = self.frames
+
+        s = self.settings
+        self.face_detector.throttle(s['detection_factor'] if level >= 1 else 1.)
+        self.balls.collision_every = s['collision_every'] if level >= 2 else 1
+        self.background_every = s['background_every'] if level >= 3 else 1
+        self.balls.max_awake = s['max_awake'] if level >= 4 else None
+
+    def update_background(self) -> bool:
+        """Check if the camera background is updated in the current frame."""
+        return self.frames % self.background_every == 0
@@ -0,0 +1,184 @@
+"""Per-stage frame time profiler.
+
+The main loop wraps its stages in named scopes:
+
+    with profiler.scope('physics'):
+        world.step(pressed_keys)
+    ...
+    profiler.end_frame()
+
+The last `window` durations of each stage are kept in ring buffers,
+from which rolling percentiles are computed on demand. The frame
+times can be streamed to a CSV or JSONL file and shown in an overlay.
+Other values of the frame (e.g. the telemetry of the camera and detector
+processes) can be added to the file rows and the overlay with `record()`.
+A disabled profiler returns a shared no-op scope, so the instrumented
+loop costs one method call per scope.
+"""
+import json
+import time
+import logging
+from contextlib import nullcontext
+
+import pygame
+import numpy as np
+
+NULL_SCOPE = nullcontext()
+
+
+class _Scope:
+    """Timing scope adding its duration to the current frame."""
+    __slots__ = ('profiler', 'name', 't0')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.t0 = 0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        frame = self.profiler.frame
+        frame[self.name] = frame.get(self.name, 0) + time.perf_counter_ns() - self.t0
+        return False
+
+
+class FrameProfiler:
+    """Frame time profiler with named scopes.
+
+    Args:
+        enabled: measure the stages (if False, all methods are no-ops)
+        window: number of frames of the rolling statistics
+        output: path of a .csv or .jsonl file receiving the stage times
+            of every frame (ms), default: no file
+        overlay_every: the overlay text is rendered again every
+            `overlay_every` frames
+
+    Attributes:
+        frame: stage durations (ns) of the current frame
+        values: values recorded in the current frame
+        frames: number of finished frames
+    """
+    def __init__(self,
+                 enabled: bool = True,
+                 window: int = 300,
+                 output: str = None,
+                 overlay_every: int = 15):
+
+        self.enabled = enabled
+        self.window = window
+        self.overlay_every = overlay_every
+        self.frame = dict()
+        self.values = dict()
+        self.last_values = dict()
+        self.frames = 0
+        self.scopes = dict()
+        self.history = dict()
+        self.frame_start = None
+
+        self.file = None
+        self.columns = None
+        if enabled and output:
+            self.file = open(output, 'w')
+            self.csv = output.endswith('.csv')
+            logging.info(f"Writing frame times to {output}")
+
+        self.font = None
+        self.overlay = None
+
+    def scope(self, name: str):
+        """Return the context manager timing the stage `name`."""
+        if not self.enabled:
+            return NULL_SCOPE
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = _Scope(self, name)
+        return scope
+
+    def record(self, **values) -> None:
+        """Add values (not stage times) to the current frame."""
+        if self.enabled:
+            self.values.update(values)
+
+    def end_frame(self) -> None:
+        """Store the stage times of the finished frame and start a new one."""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self.frame_start is None:
+            # First call: the loop starts now
+            self.frame_start = now
+            self.frame = dict()
+            self.values = dict()
+            return
+        self.frame['frame'] = now - self.frame_start
+        self.frame_start = now
+
+        k = self.frames % self.window
+        for name, ns in self.frame.items():
+            history = self.history.get(name)
+            if history is None:
+                history = self.history[name] = np.full(self.window, np.nan)
+            history[k] = ns / 1e6
+        for name, history in self.history.items():
+            if name not in self.frame:
+                history[k] = 0.
+
+        if self.file is not None:
+            self._write()
+        self.frames += 1
+        self.frame = dict()
+        if self.values:
+            self.last_values = self.values
+            self.values = dict()
+
+    def _write(self):
+        row = {name: round(ns / 1e6, 3) for name, ns in self.frame.items()}
+        row.update((name, round(value, 3)) for name, value in self.values.items())
+        if not self.csv:
+            self.file.write(json.dumps(dict(frame_index=self.frames, **row)) + '\n')
+            return
+        if self.columns is None:
+            # Columns of the first frame (later stages are not written)
+            self.columns = ['frame'] + [c for c in row if c != 'frame']
+            self.file.write(','.join(['frame_index'] + self.columns) + '\n')
+        self.file.write(','.join([str(self.frames)] + [str(row.get(c, '')) for c in self.columns])
+                        + '\n')
+
+    def stats(self) -> dict:
+        """Return the rolling {stage: (p50, p95, p99)} in ms."""
+        n = min(self.frames, self.window)
+        return {name: tuple(np.nanpercentile(history[:n], [50, 95, 99]))
+                for name, history in self.history.items() if n > 0}
+
+    def draw(self, surface: pygame.Surface, position=(5, 5)) -> pygame.Rect:
+        """Draw the statistics on the surface.
+
+        Return:
+            pygame.Rect: area covered by the overlay (empty if disabled)
+        """
+        if not self.enabled:
+            return pygame.Rect(position, (0, 0))
+        if self.overlay is None or self.frames % self.overlay_every == 0:
+            if self.font is None:
+                self.font = pygame.font.SysFont('monospace', 14)
+            lines = [f"{'stage':<10}{'p50':>7}{'p95':>7}{'p99':>7} ms"]
+            for name, (p50, p95, p99) in sorted(self.stats().items()):
+                lines.append(f"{name:<10}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}")
+            for name, value in self.last_values.items():
+                lines.append(f"{name:<21}{value:>10.1f}")
+            rendered = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+            height = self.font.get_linesize()
+            self.overlay = pygame.Surface((max(r.get_width() for r in rendered) + 10,
+                                           height * len(rendered) + 10))
+            for k, r in enumerate(rendered):
+                self.overlay.blit(r, (5, 5 + k * height))
+        return surface.blit(self.overlay, position)
+
+    def close(self) -> None:
+        """Close the output file."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
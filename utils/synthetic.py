@@ -0,0 +1,42 @@
+"""Synthetic camera frames with drawn faces.
+
+Used where no camera or test images are available: timing of the face
+detection backends (`face.resolve_backend()`) and the synthetic camera
+source (`camera.sources.SyntheticSource`).
+"""
+import cv2
+import numpy as np
+
+
+def draw_face(image: np.ndarray, center: tuple, size: int, bgr: bool = False) -> None:
+    """Draw a simple face (skin ellipse, eyes, nose, mouth) on an RGB (or BGR) image.
+
+    Args:
+        image: image (height, width, channel), modified in place
+        center: face center (x, y) in pixels
+        size: face width in pixels
+        bgr: the image is in the BGR channel order
+    """
+    def color(rgb):
+        return rgb[::-1] if bgr else rgb
+
+    cx, cy = center
+    cv2.ellipse(image, (cx, cy), (size // 2, size * 2 // 3), 0, 0, 360, color((224, 172, 140)), -1)
+    for dx in (-size // 5, size // 5):
+        cv2.ellipse(image, (cx + dx, cy - size // 8), (size // 10, size // 20),
+                    0, 0, 360, color((40, 30, 30)), -1)
+    cv2.line(image, (cx, cy - size // 20), (cx, cy + size // 8), color((180, 120, 100)), 3)
+    cv2.ellipse(image, (cx, cy + size // 4), (size // 6, size // 16),
+                0, 0, 180, color((150, 60, 60)), -1)
+
+
+def synthetic_frame(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Return an RGB frame (height, width, channel) with a drawn face on a textured background."""
+    rng = np.random.RandomState(seed)
+    frame = cv2.GaussianBlur(rng.randint(60, 200, (height, width, 3), dtype=np.uint8),
+                             (0, 0), 5)
+    size = min(width, height) // 3
+    cx = rng.randint(size, width - size)
+    cy = rng.randint(size, height - size)
+    draw_face(frame, (cx, cy), size)
+    return frame
@@ -22,3 +22,18 @@ def random_position(screen_dim: Tuple[int, int], margin: int = 0) -> Tuple[int,
     x = np.random.randint(0 + margin, screen_width - margin, 1)[0]
     y = np.random.randint(0 + margin, screen_height - margin, 1)[0]
     return (x, y)
+
+
+class PressedKeys:
+    """Stand-in for the tuple returned by pygame.key.get_pressed().
+
+    Used when there is no keyboard (headless runs, replays).
+
+    Args:
+        keys: pygame key codes which are pressed, e.g. `[pygame.K_DOWN]`
+    """
+    def __init__(self, keys=()):
+        self.keys = frozenset(keys)
+
+    def __getitem__(self, key):
+        return key in self.keys